@@ -11,6 +11,8 @@ from collections import Counter, defaultdict
 from datetime import datetime
 import re
 import os
+import pickle
+from PIL import Image, ImageColor, ImageDraw  # Pillow ships with matplotlib
 
 # Optional wordcloud import
 try:
@@ -19,13 +21,64 @@ try:
 except ImportError:
     HAS_WORDCLOUD = False
 
-def load_jsonl(filepath):
-    """Load JSONL file and return list of conversations"""
+# Optional fast-histogram import (faster uniform-bin histogram counts)
+try:
+    from fast_histogram import histogram1d
+    HAS_FAST_HISTOGRAM = True
+except ImportError:
+    HAS_FAST_HISTOGRAM = False
+
+# Optional orjson import (faster JSON parsing)
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+# Markers used by the assistant turns in the chat data
+UPDATED_PREFIX = 'Updated prompt:'
+OPTIONS_MARKER = 'Options:'
+
+# Midjourney parameters (--ar 16:9, --v 6, --stylize ...) stripped before counting words
+PARAM_PATTERN = re.compile(r'--\w+|--ar\s+\d+:\d+|--v\s+\d+\.?\d*')
+
+# Common stop words skipped by the word-frequency chart
+STOP_WORDS = frozenset({'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by'})
+
+# --fast-render: pixel size of one chart panel (6x5 in at 150 dpi, like the matplotlib output)
+FAST_PANEL_SIZE = (900, 750)
+
+def load_jsonl(filepath, use_cache=True):
+    """Load JSONL file and return list of conversations
+    
+    Parsed conversations are cached in a `<file>.cache.pkl` sidecar keyed by the
+    input's mtime and size, so re-running the plots on an unchanged file skips JSON.
+    """
+    cache_path = filepath + '.cache.pkl'
+    st = os.stat(filepath)
+    key = (st.st_mtime_ns, st.st_size)
+    if use_cache and os.path.exists(cache_path):
+        try:
+            with open(cache_path, 'rb') as f:
+                cached_key, conversations = pickle.load(f)
+            if cached_key == key:
+                return conversations
+        except Exception:
+            pass  # unreadable/stale cache: fall through and re-parse
+    
+    loads = orjson.loads if HAS_ORJSON else json.loads
     conversations = []
-    with open(filepath, 'r', encoding='utf-8') as f:
+    with open(filepath, 'rb') as f:
         for line in f:
             if line.strip():
-                conversations.append(json.loads(line))
+                conversations.append(loads(line))
+    
+    if use_cache:
+        try:
+            with open(cache_path, 'wb') as f:
+                pickle.dump((key, conversations), f, protocol=5)
+        except OSError as e:
+            print(f"Could not write cache {cache_path}: {e}")
     return conversations
 
 def extract_prompts(conversations):
@@ -34,31 +87,160 @@ def extract_prompts(conversations):
     updated_prompts = []
     questions = []
     
+    add_initial = initial_prompts.append
+    add_updated = updated_prompts.append
+    add_question = questions.append
+    prefix_len = len(UPDATED_PREFIX)
+    
     for conv in conversations:
-        messages = conv.get('messages', [])
-        for i, msg in enumerate(messages):
-            if msg['role'] == 'user':
-                content = msg['content']
-                # Skip if it's an answer to a question (short response)
-                if len(content.split()) > 10:  # Likely a prompt, not an answer
-                    initial_prompts.append(content)
-            elif msg['role'] == 'assistant':
-                content = msg['content']
-                if 'Updated prompt:' in content:
-                    updated_prompts.append(content.replace('Updated prompt:', '').strip())
-                elif '?' in content and 'Options:' in content:
-                    questions.append(content)
+        for msg in conv.get('messages', []):
+            role = msg['role']
+            content = msg['content']
+            if role == 'user':
+                # Skip if it's an answer to a question (short response);
+                # maxsplit stops counting once we know there are > 10 words
+                if len(content.split(None, 10)) > 10:  # Likely a prompt, not an answer
+                    add_initial(content)
+            elif role == 'assistant':
+                # Refinements always open with the prefix (the system prompt
+                # demands it), so slice it off instead of scanning/replacing
+                if content.startswith(UPDATED_PREFIX):
+                    add_updated(content[prefix_len:].strip())
+                # 'Options:' is the rarer substring, so test it before '?'
+                elif OPTIONS_MARKER in content and '?' in content:
+                    add_question(content)
     
     return initial_prompts, updated_prompts, questions
 
-def plot_prompt_length_distribution(initial_prompts, updated_prompts, output_dir='outputs'):
+def word_lengths(prompts):
+    """Word count of every prompt as an int32 array (computed once in main)"""
+    return np.fromiter((len(p.split()) for p in prompts), dtype=np.int32, count=len(prompts))
+
+def hist_counts(values, bins, hist_range=None):
+    """Uniform-bin histogram counts and edges (same bins as np.histogram)"""
+    values = np.asarray(values, dtype=float)
+    if hist_range is not None:
+        lo, hi = hist_range
+    elif values.size:
+        lo, hi = values.min(), values.max()
+    else:
+        lo, hi = 0.0, 1.0
+    if lo == hi:
+        lo, hi = lo - 0.5, hi + 0.5
+    edges = np.linspace(lo, hi, bins + 1)
+    if HAS_FAST_HISTOGRAM:
+        counts = histogram1d(values, bins=bins, range=(lo, hi))
+        # fast_histogram's range is half-open; NumPy's last bin also takes values == hi
+        counts[-1] += np.count_nonzero(values == hi)
+    else:
+        counts, _ = np.histogram(values, bins=edges)
+    return counts, edges
+
+def draw_hist(ax, values, bins, hist_range=None, **bar_kwargs):
+    """Drop-in for ax.hist() that draws precomputed counts with ax.bar()"""
+    counts, edges = hist_counts(values, bins, hist_range)
+    ax.bar(edges[:-1], counts, width=np.diff(edges), align='edge', **bar_kwargs)
+
+def hist_panel(values, bins, color, title, xlabel, hist_range=None):
+    """Histogram panel for save_fast_bar_figure(), counted with hist_counts()"""
+    counts, edges = hist_counts(values, bins, hist_range)
+    return {
+        'series': [(edges[:-1], np.diff(edges), counts, color, None)],
+        'title': title, 'xlabel': xlabel, 'ylabel': 'Frequency', 'edges': True,
+        'mean': float(np.mean(values)) if len(values) else None,
+    }
+
+def _on_white(color, alpha=0.7):
+    """Colour name → RGB of that colour drawn with `alpha` over a white background"""
+    rgb = np.array(ImageColor.getrgb(color)[:3], dtype=float)
+    return tuple(int(round(v)) for v in alpha * rgb + (1 - alpha) * 255)
+
+def save_fast_bar_figure(panels, output_path):
+    """Render bar/histogram panels side by side straight to a PNG.
+
+    A lightweight alternative to matplotlib for --fast-render: bars are filled by
+    slice assignment on a NumPy RGB canvas, then Pillow draws axes, ticks and text.
+    Each panel is a dict with 'series' [(lefts, widths, heights, color, label)],
+    'title', 'xlabel', 'ylabel', optional 'edges' (outline bars) and 'mean'.
+    """
+    pw, ph = FAST_PANEL_SIZE
+    canvas = np.full((ph, pw * len(panels), 3), 255, dtype=np.uint8)
+    layouts = []
+    
+    for i, panel in enumerate(panels):
+        x0, y0, x1, y1 = i * pw + 80, 50, (i + 1) * pw - 30, ph - 70  # plot area
+        lefts = np.concatenate([np.asarray(s[0], float) for s in panel['series']])
+        rights = np.concatenate([np.asarray(s[0], float) + s[1] for s in panel['series']])
+        heights = np.concatenate([np.asarray(s[2], float) for s in panel['series']])
+        x_lo, x_hi = (lefts.min(), rights.max()) if lefts.size else (0.0, 1.0)
+        if x_hi <= x_lo:
+            x_hi = x_lo + 1
+        y_hi = heights.max() * 1.05 if heights.size and heights.max() > 0 else 1.0
+        sx, sy = (x1 - x0) / (x_hi - x_lo), (y1 - y0) / y_hi
+        
+        for lft, wid, hgt, color, _ in panel['series']:
+            fill = _on_white(color)
+            c0s = (x0 + (np.asarray(lft, float) - x_lo) * sx).astype(int)
+            c1s = np.maximum(c0s + 1, (x0 + (np.asarray(lft, float) + wid - x_lo) * sx).astype(int))
+            r0s = (y1 - np.asarray(hgt, float) * sy).astype(int)
+            for c0, c1, r0 in zip(c0s.tolist(), c1s.tolist(), r0s.tolist()):
+                if r0 >= y1:
+                    continue
+                canvas[r0:y1, c0:c1] = fill
+                if panel.get('edges'):
+                    canvas[r0:y1, [c0, c1 - 1]] = 0
+                    canvas[r0, c0:c1] = 0
+        layouts.append((x0, y0, x1, y1, x_lo, x_hi, y_hi, sx))
+    
+    img = Image.fromarray(canvas)
+    draw = ImageDraw.Draw(img)
+    for panel, (x0, y0, x1, y1, x_lo, x_hi, y_hi, sx) in zip(panels, layouts):
+        draw.rectangle([x0, y0, x1, y1], outline='black')
+        for frac in (0, 0.25, 0.5, 0.75, 1):
+            tx = x0 + frac * (x1 - x0)
+            draw.line([tx, y1, tx, y1 + 5], fill='black')
+            draw.text((tx, y1 + 8), f"{x_lo + frac * (x_hi - x_lo):g}", fill='black', anchor='mt')
+            ty = y1 - frac * (y1 - y0)
+            draw.line([x0 - 5, ty, x0, ty], fill='black')
+            draw.text((x0 - 8, ty), f"{frac * y_hi:.0f}", fill='black', anchor='rm')
+        draw.text(((x0 + x1) / 2, y0 - 25), panel['title'], fill='black', anchor='mm')
+        draw.text(((x0 + x1) / 2, y1 + 35), panel['xlabel'], fill='black', anchor='mm')
+        draw.text((x0, y0 - 8), panel['ylabel'], fill='black', anchor='lb')
+        
+        legend = [(label, _on_white(color)) for *_, color, label in panel['series'] if label]
+        mean = panel.get('mean')
+        if mean is not None:
+            mx = x0 + (mean - x_lo) * sx
+            for ty in range(y0, y1, 12):  # dashed line
+                draw.line([mx, ty, mx, min(ty + 6, y1)], fill='red', width=2)
+            legend.append((f"Mean: {mean:.1f}", (255, 0, 0)))
+        for k, (label, color) in enumerate(legend):
+            ly = y0 + 12 + 18 * k
+            draw.rectangle([x1 - 150, ly - 5, x1 - 140, ly + 5], fill=color)
+            draw.text((x1 - 134, ly), label, fill='black', anchor='lm')
+    
+    img.save(output_path)
+    print(f"Saved: {output_path}")
+
+def plot_prompt_length_distribution(initial_prompts, updated_prompts, output_dir='outputs',
+                                    initial_lengths=None, updated_lengths=None, fast=False):
     """Visualize distribution of prompt lengths"""
-    initial_lengths = [len(p.split()) for p in initial_prompts]
-    updated_lengths = [len(p.split()) for p in updated_prompts]
+    if initial_lengths is None:
+        initial_lengths = word_lengths(initial_prompts)
+    if updated_lengths is None:
+        updated_lengths = word_lengths(updated_prompts)
+    output_path = os.path.join(output_dir, 'prompt_length_distribution.png')
+    
+    if fast:
+        save_fast_bar_figure([
+            hist_panel(initial_lengths, 30, 'skyblue', 'Initial Prompt Length Distribution', 'Number of Words'),
+            hist_panel(updated_lengths, 30, 'lightcoral', 'Updated Prompt Length Distribution', 'Number of Words'),
+        ], output_path)
+        return
     
     fig, axes = plt.subplots(1, 2, figsize=(12, 5))
     
-    axes[0].hist(initial_lengths, bins=30, alpha=0.7, color='skyblue', edgecolor='black')
+    draw_hist(axes[0], initial_lengths, bins=30, alpha=0.7, color='skyblue', edgecolor='black')
     axes[0].set_title('Initial Prompt Length Distribution', fontsize=12)
     axes[0].set_xlabel('Number of Words')
     axes[0].set_ylabel('Frequency')
@@ -66,7 +248,7 @@ def plot_prompt_length_distribution(initial_prompts, updated_prompts, output_dir
                     label=f'Mean: {np.mean(initial_lengths):.1f}')
     axes[0].legend()
     
-    axes[1].hist(updated_lengths, bins=30, alpha=0.7, color='lightcoral', edgecolor='black')
+    draw_hist(axes[1], updated_lengths, bins=30, alpha=0.7, color='lightcoral', edgecolor='black')
     axes[1].set_title('Updated Prompt Length Distribution', fontsize=12)
     axes[1].set_xlabel('Number of Words')
     axes[1].set_ylabel('Frequency')
@@ -75,15 +257,17 @@ def plot_prompt_length_distribution(initial_prompts, updated_prompts, output_dir
     axes[1].legend()
     
     plt.tight_layout()
-    output_path = os.path.join(output_dir, 'prompt_length_distribution.png')
     plt.savefig(output_path, dpi=150, bbox_inches='tight')
     print(f"Saved: {output_path}")
     plt.close()
 
-def plot_length_comparison(initial_prompts, updated_prompts, output_dir='outputs'):
+def plot_length_comparison(initial_prompts, updated_prompts, output_dir='outputs',
+                           initial_lengths=None, updated_lengths=None, fast=False):
     """Compare initial vs updated prompt lengths"""
-    initial_lengths = [len(p.split()) for p in initial_prompts]
-    updated_lengths = [len(p.split()) for p in updated_prompts]
+    if initial_lengths is None:
+        initial_lengths = word_lengths(initial_prompts)
+    if updated_lengths is None:
+        updated_lengths = word_lengths(updated_prompts)
     
     # Match pairs (assuming same order)
     min_len = min(len(initial_lengths), len(updated_lengths))
@@ -94,12 +278,22 @@ def plot_length_comparison(initial_prompts, updated_prompts, output_dir='outputs
     max_show = min(50, len(initial_lengths))
     initial_lengths = initial_lengths[:max_show]
     updated_lengths = updated_lengths[:max_show]
-    
-    fig, ax = plt.subplots(figsize=(10, 6))
+    output_path = os.path.join(output_dir, 'prompt_length_comparison.png')
     
     x = np.arange(len(initial_lengths))
     width = 0.35
     
+    if fast:
+        save_fast_bar_figure([{
+            'series': [(x - width, width, initial_lengths, 'skyblue', 'Initial'),
+                       (x, width, updated_lengths, 'lightcoral', 'Updated')],
+            'title': 'Initial vs Updated Prompt Length Comparison',
+            'xlabel': f'Prompt Index (showing first {max_show})', 'ylabel': 'Number of Words',
+        }], output_path)
+        return
+    
+    fig, ax = plt.subplots(figsize=(10, 6))
+    
     ax.bar(x - width/2, initial_lengths, width, label='Initial', alpha=0.7, color='skyblue')
     ax.bar(x + width/2, updated_lengths, width, label='Updated', alpha=0.7, color='lightcoral')
     
@@ -110,34 +304,34 @@ def plot_length_comparison(initial_prompts, updated_prompts, output_dir='outputs
     ax.grid(True, alpha=0.3)
     
     plt.tight_layout()
-    output_path = os.path.join(output_dir, 'prompt_length_comparison.png')
     plt.savefig(output_path, dpi=150, bbox_inches='tight')
     print(f"Saved: {output_path}")
     plt.close()
 
+def top_counts(counter, top_n):
+    """Counter.most_common(top_n) split into a label list and an int64 count array"""
+    items = counter.most_common(top_n)
+    counts = np.fromiter((c for _, c in items), dtype=np.int64, count=len(items))
+    return [w for w, _ in items], counts
+
 def plot_word_frequency(prompts, title, output_dir='outputs', top_n=30):
     """Plot most frequent words in prompts"""
-    # Extract words (excluding Midjourney parameters)
-    all_words = []
-    param_pattern = re.compile(r'--\w+|--ar\s+\d+:\d+|--v\s+\d+\.?\d*')
+    # Count words (excluding Midjourney parameters) straight into the Counter
+    word_counts = Counter()
     
     for prompt in prompts:
-        # Remove Midjourney parameters
-        clean_prompt = param_pattern.sub('', prompt)
-        words = clean_prompt.lower().split()
-        # Filter out very short words and common stop words
-        stop_words = {'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by'}
-        words = [w for w in words if len(w) > 3 and w not in stop_words]
-        all_words.extend(words)
+        # Remove Midjourney parameters (only prompts containing '--' need the regex),
+        # skip very short words and stop words
+        clean_prompt = PARAM_PATTERN.sub('', prompt) if '--' in prompt else prompt
+        word_counts.update(w for w in clean_prompt.lower().split()
+                           if len(w) > 3 and w not in STOP_WORDS)
     
-    word_counts = Counter(all_words)
-    top_words = word_counts.most_common(top_n)
-    
-    words, counts = zip(*top_words) if top_words else ([], [])
+    words, counts = top_counts(word_counts, top_n)
+    y = np.arange(len(words))
     
     fig, ax = plt.subplots(figsize=(12, 8))
-    ax.barh(range(len(words)), counts, color='steelblue')
-    ax.set_yticks(range(len(words)))
+    ax.barh(y, counts, color='steelblue')
+    ax.set_yticks(y)
     ax.set_yticklabels(words)
     ax.set_xlabel('Frequency')
     ax.set_title(f'Top {top_n} Most Frequent Words - {title}')
@@ -159,8 +353,8 @@ def create_wordcloud(prompts, title, output_dir='outputs'):
     text = ' '.join(prompts)
     
     # Remove Midjourney parameters
-    param_pattern = re.compile(r'--\w+|--ar\s+\d+:\d+|--v\s+\d+\.?\d*')
-    text = param_pattern.sub('', text)
+    if '--' in text:
+        text = PARAM_PATTERN.sub('', text)
     
     try:
         wordcloud = WordCloud(width=1200, height=600, background_color='white',
@@ -179,7 +373,7 @@ def create_wordcloud(prompts, title, output_dir='outputs'):
     except Exception as e:
         print(f"Could not create word cloud: {e}")
 
-def plot_conversation_stats(conversations, output_dir='outputs'):
+def plot_conversation_stats(conversations, output_dir='outputs', fast=False):
     """Plot statistics about conversations"""
     conversation_lengths = []
     refinement_counts = []
@@ -191,10 +385,18 @@ def plot_conversation_stats(conversations, output_dir='outputs'):
         # Count refinement steps (Updated prompt messages)
         refinements = sum(1 for msg in messages if 'Updated prompt:' in msg.get('content', ''))
         refinement_counts.append(refinements)
+    output_path = os.path.join(output_dir, 'conversation_stats.png')
+    
+    if fast:
+        save_fast_bar_figure([
+            hist_panel(conversation_lengths, 20, 'mediumpurple', 'Conversation Length Distribution', 'Number of Messages'),
+            hist_panel(refinement_counts, 10, 'gold', 'Number of Refinements per Conversation', 'Number of Refinements'),
+        ], output_path)
+        return
     
     fig, axes = plt.subplots(1, 2, figsize=(12, 5))
     
-    axes[0].hist(conversation_lengths, bins=20, alpha=0.7, color='mediumpurple', edgecolor='black')
+    draw_hist(axes[0], conversation_lengths, bins=20, alpha=0.7, color='mediumpurple', edgecolor='black')
     axes[0].set_title('Conversation Length Distribution', fontsize=12)
     axes[0].set_xlabel('Number of Messages')
     axes[0].set_ylabel('Frequency')
@@ -202,7 +404,7 @@ def plot_conversation_stats(conversations, output_dir='outputs'):
                     label=f'Mean: {np.mean(conversation_lengths):.1f}')
     axes[0].legend()
     
-    axes[1].hist(refinement_counts, bins=10, alpha=0.7, color='gold', edgecolor='black')
+    draw_hist(axes[1], refinement_counts, bins=10, alpha=0.7, color='gold', edgecolor='black')
     axes[1].set_title('Number of Refinements per Conversation', fontsize=12)
     axes[1].set_xlabel('Number of Refinements')
     axes[1].set_ylabel('Frequency')
@@ -211,7 +413,6 @@ def plot_conversation_stats(conversations, output_dir='outputs'):
     axes[1].legend()
     
     plt.tight_layout()
-    output_path = os.path.join(output_dir, 'conversation_stats.png')
     plt.savefig(output_path, dpi=150, bbox_inches='tight')
     print(f"Saved: {output_path}")
     plt.close()
@@ -234,20 +435,20 @@ def plot_question_analysis(questions, output_dir='outputs'):
     
     # Plot question start words
     start_counter = Counter(question_starts)
-    top_starts = start_counter.most_common(15)
+    words, counts = top_counts(start_counter, 15)
     
     fig, axes = plt.subplots(1, 2, figsize=(12, 5))
     
-    if top_starts:
-        words, counts = zip(*top_starts)
-        axes[0].barh(range(len(words)), counts, color='teal')
-        axes[0].set_yticks(range(len(words)))
+    if words:
+        y = np.arange(len(words))
+        axes[0].barh(y, counts, color='teal')
+        axes[0].set_yticks(y)
         axes[0].set_yticklabels(words)
         axes[0].set_xlabel('Frequency')
         axes[0].set_title('Most Common Question Start Words')
         axes[0].invert_yaxis()
     
-    axes[1].hist(option_counts, bins=range(1, 6), alpha=0.7, color='coral', edgecolor='black')
+    draw_hist(axes[1], option_counts, bins=4, hist_range=(1, 5), alpha=0.7, color='coral', edgecolor='black')
     axes[1].set_title('Number of Options per Question')
     axes[1].set_xlabel('Number of Options')
     axes[1].set_ylabel('Frequency')
@@ -259,7 +460,8 @@ def plot_question_analysis(questions, output_dir='outputs'):
     print(f"Saved: {output_path}")
     plt.close()
 
-def print_summary_stats(conversations, initial_prompts, updated_prompts, questions):
+def print_summary_stats(conversations, initial_prompts, updated_prompts, questions,
+                        initial_lengths=None, updated_lengths=None):
     """Print summary statistics"""
     print("\n" + "="*60)
     print("MIDJOURNEY CHAT DATA SUMMARY")
@@ -270,11 +472,15 @@ def print_summary_stats(conversations, initial_prompts, updated_prompts, questio
     print(f"Questions Asked: {len(questions)}")
     
     if initial_prompts:
-        avg_initial = np.mean([len(p.split()) for p in initial_prompts])
+        if initial_lengths is None:
+            initial_lengths = word_lengths(initial_prompts)
+        avg_initial = np.mean(initial_lengths)
         print(f"\nAverage Initial Prompt Length: {avg_initial:.1f} words")
     
     if updated_prompts:
-        avg_updated = np.mean([len(p.split()) for p in updated_prompts])
+        if updated_lengths is None:
+            updated_lengths = word_lengths(updated_prompts)
+        avg_updated = np.mean(updated_lengths)
         print(f"Average Updated Prompt Length: {avg_updated:.1f} words")
         if initial_prompts:
             length_change = avg_updated - avg_initial
@@ -300,6 +506,16 @@ def main():
         default="outputs",
         help="Output directory for visualizations (default: outputs)"
     )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Always re-parse the JSONL instead of using the .cache.pkl sidecar"
+    )
+    parser.add_argument(
+        "--fast-render",
+        action="store_true",
+        help="Draw the histogram/bar charts with NumPy + Pillow instead of matplotlib (faster, plainer)"
+    )
     parser.add_argument(
         "--all",
         action="store_true",
@@ -338,17 +554,23 @@ def main():
     
     # Load data
     print(f"Loading data from {args.input}...")
-    conversations = load_jsonl(args.input)
+    conversations = load_jsonl(args.input, use_cache=not args.no_cache)
     initial_prompts, updated_prompts, questions = extract_prompts(conversations)
+    # Word counts are shared by the summary and the length plots
+    initial_lengths = word_lengths(initial_prompts)
+    updated_lengths = word_lengths(updated_prompts)
     
     # Print summary
-    print_summary_stats(conversations, initial_prompts, updated_prompts, questions)
+    print_summary_stats(conversations, initial_prompts, updated_prompts, questions,
+                        initial_lengths, updated_lengths)
     
     # Generate visualizations
     if args.all or args.lengths:
         print("Generating length distribution plots...")
-        plot_prompt_length_distribution(initial_prompts, updated_prompts, args.output_dir)
-        plot_length_comparison(initial_prompts, updated_prompts, args.output_dir)
+        plot_prompt_length_distribution(initial_prompts, updated_prompts, args.output_dir,
+                                        initial_lengths, updated_lengths, fast=args.fast_render)
+        plot_length_comparison(initial_prompts, updated_prompts, args.output_dir,
+                               initial_lengths, updated_lengths, fast=args.fast_render)
     
     if args.all or args.wordfreq:
         print("Generating word frequency charts...")
@@ -366,7 +588,7 @@ def main():
     
     if args.all or args.stats:
         print("Generating conversation statistics...")
-        plot_conversation_stats(conversations, args.output_dir)
+        plot_conversation_stats(conversations, args.output_dir, fast=args.fast_render)
     
     if args.all or args.questions:
         print("Analyzing questions...")
@@ -0,0 +1,26 @@
+"""
+_stamp_cells.py
+---------------
+Box → grid-cell stamping shared by the build_*_heat_dataset.py scripts.
+"""
+
+import numpy as np
+
+
+def stamp_cells(gx0, gy0, gx1, gy1, out):
+    """Inclusive cell spans (int arrays) → binary stamp into out (hy×hx).
+
+    Every span drops ±1 on the four corners of an (hy+1)×(hx+1) difference
+    array; two cumulative sums turn that into per-cell coverage counts.
+    """
+    hy, hx = out.shape
+    x0, x1 = np.clip(gx0, 0, hx), np.clip(gx1 + 1, 0, hx)
+    y0, y1 = np.clip(gy0, 0, hy), np.clip(gy1 + 1, 0, hy)
+    keep = (x1 > x0) & (y1 > y0)
+    x0, x1, y0, y1 = x0[keep], x1[keep], y0[keep], y1[keep]
+    d = np.zeros((hy + 1, hx + 1), np.int32)
+    np.add.at(d, (y0, x0), 1)
+    np.add.at(d, (y0, x1), -1)
+    np.add.at(d, (y1, x0), -1)
+    np.add.at(d, (y1, x1), 1)
+    out[:] = d.cumsum(0).cumsum(1)[:hy, :hx] > 0
@@ -1,30 +1,61 @@
 #!/usr/bin/env python
 # Build a JSONL file of 12×21 heat-maps for Image/Decoration labels.
 # ------------------------------------------------------------------
-import argparse, json, glob, pathlib, numpy as np
-from scipy.ndimage import gaussian_filter
+import argparse, json, os, pathlib, numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from scipy.ndimage import gaussian_filter1d
+
+from _stamp_cells import stamp_cells
+
+try:                                      # optional fast JSON
+    import orjson
+    _loads = orjson.loads
+    _dumpb = orjson.dumps
+except ImportError:
+    _loads = json.loads
+    def _dumpb(obj):
+        return json.dumps(obj, ensure_ascii=False).encode("utf-8")
 
 LABELS = {"image", "decoration"}          # lower-case
 HX, HY  = 12, 21                          # grid resolution
 SIGMA   = 1.0                             # blur in grid cells
+FLUSH_BYTES = 1 << 20                     # write JSONL in ~1 MB batches
+CELL_TEXT = [f"{i/10:.1f}" for i in range(11)]  # "0.0" … "1.0"
 
-def rects_to_grid(rects):
-    """list of (x%,y%,w%,h%) → blurred HY×HX grid"""
-    g = np.zeros((HY, HX), float)
-    for x, y, w, h in rects:
-        gx0 = int(x         / (100/HX))
-        gy0 = int(y         / (100/HY))
-        gx1 = int((x+w)     / (100/HX))
-        gy1 = int((y+h)     / (100/HY))
-        g[gy0:gy1+1, gx0:gx1+1] = 1
+@lru_cache(maxsize=None)
+def blur_matrix(n, sigma):
+    """1-D Gaussian blur (reflect) as an n×n matrix; Ky @ g @ Kx.T == gaussian_filter(g)"""
+    return gaussian_filter1d(np.eye(n), sigma, axis=0).astype(np.float32)
+
+def rects_to_grid(rects, out=None):
+    """list of (x%,y%,w%,h%) → blurred grid as flat uint8 tenths (stamps into uint8 `out`)"""
+    if out is None:
+        g = np.zeros((HY, HX), np.uint8)
+    else:
+        g = out; g.fill(0)
+    if rects:
+        x, y, w, h = np.asarray(rects, dtype=float).T
+        stamp_cells((x       / (100/HX)).astype(int),
+                    (y       / (100/HY)).astype(int),
+                    ((x+w)   / (100/HX)).astype(int),
+                    ((y+h)   / (100/HY)).astype(int), g)
     if SIGMA:
-        g = gaussian_filter(g, sigma=SIGMA)
-    if g.max() > 0:
-        g /= g.max()
-    return g
+        g = blur_matrix(HY, SIGMA) @ (g @ blur_matrix(HX, SIGMA).T)  # float32
+    peak = g.max()
+    if peak == 0:
+        return np.zeros(HY * HX, np.uint8)
+    return np.rint(g.ravel() * (10 / peak)).astype(np.uint8)
 
-def extract_rects(task):
-    """Return list of (x%,y%,w%,h%) for Image / Decoration."""
+def grid_to_text(g):
+    """uint8 tenths → "0.0 0.3 …" row text, one CELL_TEXT lookup per cell"""
+    return " ".join([CELL_TEXT[i] for i in g.tolist()])
+
+def extract_rects(task, rects=None):
+    """Return list of (x%,y%,w%,h%) for Image / Decoration.
+
+    Pass `rects` to refill (and return) an existing list instead.
+    """
     # dig down to the result list
     if "annotation" in task:
         results = task["annotation"]["result"]
@@ -33,7 +64,10 @@ def extract_rects(task):
     else:
         results = task.get("annotations", [{}])[0].get("result", [])
 
-    rects = []
+    if rects is None:
+        rects = []
+    else:
+        rects.clear()
     for r in results:
         # 1) Rectangle tasks
         if "rectanglelabels" in r["value"]:
@@ -54,27 +88,62 @@ def extract_rects(task):
     return rects
 
 
-def main(src_dir, dst_jsonl):
-    rows = 0
-    with open(dst_jsonl, "w", encoding="utf-8") as out:
-        for jf in glob.glob(str(pathlib.Path(src_dir) / "*.json")):
-            task  = json.load(open(jf, encoding="utf-8"))
-            rects = extract_rects(task)
-
-            grid  = rects_to_grid(rects)
-            flat  = " ".join(f"{v:.1f}" for v in grid.flatten())
-
-            # JSONL row – system+user only (assistant left blank)
-            out.write(json.dumps({
-                "messages":[
-                    {"role":"system",
-                     "content":"<IMAGE_HEAT> Predict layout of images/decoration."},
-                    {"role":"user",
-                     "content":f"FRAME_PCT 100 100\nimage_deco_heat {flat}"},
-                    {"role":"assistant","content":""}
-                ]
-            }, ensure_ascii=False)+"\n")
+_scratch = {}                             # per-process buffers (_init_worker)
+
+def _init_worker(hx, hy, sigma):
+    """Copy grid settings into this process and allocate scratch buffers."""
+    global HX, HY, SIGMA
+    HX, HY, SIGMA = hx, hy, sigma
+    _scratch["grid"], _scratch["rects"] = np.zeros((HY, HX), np.uint8), []
+
+def poster_line(jf):
+    """One per-poster JSON file → its JSONL line (bytes, newline included)."""
+    task  = _loads(pathlib.Path(jf).read_bytes())
+    rects = extract_rects(task, _scratch["rects"])
+
+    grid  = rects_to_grid(rects, out=_scratch["grid"])
+    flat  = grid_to_text(grid)
+
+    # JSONL row – system+user only (assistant left blank)
+    return _dumpb({
+        "messages":[
+            {"role":"system",
+             "content":"<IMAGE_HEAT> Predict layout of images/decoration."},
+            {"role":"user",
+             "content":f"FRAME_PCT 100 100\nimage_deco_heat {flat}"},
+            {"role":"assistant","content":""}
+        ]
+    }) + b"\n"
+
+def write_lines(dst, lines):
+    """Write JSONL lines in FLUSH_BYTES batches; return the row count."""
+    rows, buf = 0, bytearray()
+    with open(dst, "wb") as out:
+        for line in lines:
+            buf += line
+            if len(buf) >= FLUSH_BYTES:
+                out.write(buf); buf.clear()
             rows += 1
+        out.write(buf)
+    return rows
+
+def json_files(src):
+    """Sorted *.json files in src (one os.scandir pass, dot-files skipped like glob)"""
+    with os.scandir(src) as it:
+        return sorted(e.path for e in it
+                      if e.name.endswith(".json") and not e.name.startswith(".")
+                      and e.is_file(follow_symlinks=False))
+
+def main(src_dir, dst_jsonl, workers=None):
+    files = json_files(src_dir)
+    _init_worker(HX, HY, SIGMA)
+    if workers == 1:
+        rows = write_lines(dst_jsonl, map(poster_line, files))
+    else:                                 # parse + grid in worker processes
+        with ProcessPoolExecutor(workers, initializer=_init_worker,
+                                 initargs=(HX, HY, SIGMA)) as pool:
+            rows = write_lines(dst_jsonl,
+                               pool.map(poster_line, files, chunksize=64))
     print(f"Wrote {rows} posters → {dst_jsonl}")
 
 if __name__ == "__main__":
@@ -85,6 +154,8 @@ if __name__ == "__main__":
                     help="Output JSONL filename")
     ap.add_argument("--grid", nargs=2, type=int, metavar=("HX","HY"),
                     default=[HX, HY], help="Grid cols rows (default 12 21)")
+    ap.add_argument("--workers", type=int, default=None,
+                    help="Worker processes (default: all cores, 1 = serial)")
     args = ap.parse_args()
     HX, HY = args.grid
-    main(args.src, args.dst)
+    main(args.src, args.dst, args.workers)
@@ -1,42 +1,79 @@
 #!/usr/bin/env python
 # build_img_deco_heat_dataset.py  –  write image + decoration grids to JSONL
+#   --mode image_only  writes the merged image_deco_heat rows that
+#                      build_image_heat_dataset.py produces
+#   --mode both        writes both datasets from a single parse of each file
 # ------------------------------------------------------------------------
-import argparse, json, glob, pathlib, numpy as np
-from scipy.ndimage import gaussian_filter
+import argparse, json, os, pathlib, numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
+from functools import lru_cache
+from scipy.ndimage import gaussian_filter1d
+
+from _stamp_cells import stamp_cells
+
+try:                                      # optional fast JSON
+    import orjson
+    _loads = orjson.loads
+    _dumpb = orjson.dumps
+except ImportError:
+    _loads = json.loads
+    def _dumpb(obj):
+        return json.dumps(obj, ensure_ascii=False).encode("utf-8")
 
 # editable defaults -------------------------------------------------------
 SRC_DIR = r"E:\SIA_works\PosterDatabase\Label_Studio\annotations_split_3"
 DST_FILE = "validation_heat.jsonl"
+DST_IMAGE_FILE = "image_heat.jsonl"   # merged-grid output of --mode both
 HX, HY   = 12, 21        # grid resolution   (override with --grid 15 26)
 SIGMA    = 1.0           # blur in grid cells
+FLUSH_BYTES = 1 << 20    # write JSONL in ~1 MB batches
+CELL_TEXT = [f"{i/10:.1f}" for i in range(11)]   # "0.0" … "1.0"
+MODES    = ("image_deco", "image_only", "both")
 # -------------------------------------------------------------------------
 
 LABELS = {"image": "image_heat",
           "decoration": "decoration_heat"}      # LS label → tag in JSONL
 
 # ── helpers ───────────────────────────────────────────────────────────────
-def rects_to_grid(rects):
-    """list[(x%,y%,w%,h%)] → HY×HX grid (0–1)"""
-    g = np.zeros((HY, HX))
-    for x,y,w,h in rects:
-        gx0 = int(x        / (100/HX))
-        gy0 = int(y        / (100/HY))
-        gx1 = int((x+w)    / (100/HX))
-        gy1 = int((y+h)    / (100/HY))
-        g[gy0:gy1+1, gx0:gx1+1] = 1
+@lru_cache(maxsize=None)
+def blur_matrix(n, sigma):
+    """n×n blur matrix: M @ v == gaussian_filter1d(v, sigma), cached per size"""
+    return gaussian_filter1d(np.eye(n), sigma, axis=0).astype(np.float32)
+
+def rects_to_grid(rects, out=None):
+    """list[(x%,y%,w%,h%)] → flat uint8 tenths (0–10); stamps into uint8 out if given"""
+    if out is None:
+        g = np.zeros((HY, HX), np.uint8)
+    else:
+        g = out; g.fill(0)
+    if rects:
+        x,y,w,h = np.asarray(rects, dtype=float).T
+        stamp_cells((x      / (100/HX)).astype(int),
+                    (y      / (100/HY)).astype(int),
+                    ((x+w)  / (100/HX)).astype(int),
+                    ((y+h)  / (100/HY)).astype(int), g)
     if SIGMA:
-        g = gaussian_filter(g, SIGMA)
-    if g.max()>0:
-        g /= g.max()
-    return g
+        g = blur_matrix(HY, SIGMA) @ (g @ blur_matrix(HX, SIGMA).T)  # float32
+    peak = g.max()
+    if peak == 0:
+        return np.zeros(HY * HX, np.uint8)
+    return np.rint(g.ravel() * (10 / peak)).astype(np.uint8)
 
-def extract_boxes(task):
-    """Return dict label→list[(x%,y%,w%,h%)]"""
+def grid_to_text(g):
+    """uint8 tenths → "0.0 0.3 …" text; each cell is a CELL_TEXT lookup"""
+    return " ".join([CELL_TEXT[i] for i in g.tolist()])
+
+def extract_boxes(task, buckets=None):
+    """Return dict label→list[(x%,y%,w%,h%)] (refills `buckets` if given)"""
     res = (task.get("annotation",{}).get("result") or
            task.get("result") or
            task.get("annotations",[{}])[0].get("result", []))
 
-    buckets = {lab: [] for lab in LABELS}
+    if buckets is None:
+        buckets = {lab: [] for lab in LABELS}
+    else:
+        for boxes in buckets.values(): boxes.clear()
     for r in res:
         # rectangles
         if "rectanglelabels" in r["value"]:
@@ -53,29 +90,93 @@ def extract_boxes(task):
                 buckets[lab].append((x0,y0,max(xs)-x0,max(ys)-y0))
     return buckets
 
+# ── row writer (also runs inside pool workers) ─────────────────────────
+_scratch = {}                    # per-process buffers, see _init_worker
+
+def _init_worker(hx, hy, sigma, mode="image_deco"):
+    """Copy grid settings into this process and allocate scratch buffers."""
+    global HX, HY, SIGMA
+    HX, HY, SIGMA = hx, hy, sigma
+    _scratch["mode"]    = mode
+    _scratch["grids"]   = {lab: np.zeros((HY, HX), np.uint8) for lab in LABELS}
+    _scratch["buckets"] = {lab: [] for lab in LABELS}
+    _scratch["merged"]  = np.zeros((HY, HX), np.uint8)
+
+def image_deco_line(buckets):
+    """Separate image_heat / decoration_heat grids → JSONL line (bytes)"""
+    user_lines = ["FRAME_PCT 100 100"]
+    for lab, tag in LABELS.items():
+        grid = rects_to_grid(buckets[lab], out=_scratch["grids"][lab])
+        flat = grid_to_text(grid)
+        user_lines.append(f"{tag} {flat}")
+
+    return _dumpb({
+        "messages":[
+          {"role":"system",
+           "content":"<IMAGE_HEAT> Predict image & decoration layout."},
+          {"role":"user","content":"\n".join(user_lines)},
+          {"role":"assistant","content":""}
+        ]}) + b"\n"
+
+def image_only_line(buckets):
+    """One merged image|decoration grid → JSONL line (build_image_heat format)"""
+    rects = buckets["image"] + buckets["decoration"]
+    flat  = grid_to_text(rects_to_grid(rects, out=_scratch["merged"]))
+    return _dumpb({
+        "messages":[
+          {"role":"system",
+           "content":"<IMAGE_HEAT> Predict layout of images/decoration."},
+          {"role":"user",
+           "content":f"FRAME_PCT 100 100\nimage_deco_heat {flat}"},
+          {"role":"assistant","content":""}
+        ]}) + b"\n"
+
+def poster_line(jf):
+    """One per-poster JSON file → tuple of JSONL lines, one per output file."""
+    task    = _loads(pathlib.Path(jf).read_bytes())
+    buckets = extract_boxes(task, _scratch["buckets"])
+    mode    = _scratch["mode"]
+    if mode == "image_deco":
+        return (image_deco_line(buckets),)
+    if mode == "image_only":
+        return (image_only_line(buckets),)
+    return image_deco_line(buckets), image_only_line(buckets)
+
+def write_lines(dsts, rows):
+    """Write tuples of JSONL lines (one per dst) in FLUSH_BYTES batches;
+    return the row count."""
+    n, bufs = 0, [bytearray() for _ in dsts]
+    with ExitStack() as stack:
+        outs = [stack.enter_context(open(d, "wb")) for d in dsts]
+        for lines in rows:
+            for out, buf, line in zip(outs, bufs, lines):
+                buf += line
+                if len(buf) >= FLUSH_BYTES:
+                    out.write(buf); buf.clear()
+            n += 1
+        for out, buf in zip(outs, bufs):
+            out.write(buf)
+    return n
+
+def json_files(src):
+    """All *.json posters in src, sorted; a single scandir pass (no fnmatch)"""
+    with os.scandir(src) as it:
+        return sorted(e.path for e in it
+                      if e.name.endswith(".json") and not e.name.startswith(".")
+                      and e.is_file(follow_symlinks=False))
+
 # ── main writer ───────────────────────────────────────────────────────────
-def main(src, dst):
-    rows = 0
-    with open(dst, "w", encoding="utf-8") as out:
-        for jf in glob.glob(str(pathlib.Path(src) / "*.json")):
-            task   = json.load(open(jf, encoding="utf-8"))
-            buckets = extract_boxes(task)
-
-            user_lines = ["FRAME_PCT 100 100"]
-            for lab, tag in LABELS.items():
-                grid = rects_to_grid(buckets[lab])
-                flat = " ".join(f"{v:.1f}" for v in grid.flatten())
-                user_lines.append(f"{tag} {flat}")
-
-            out.write(json.dumps({
-                "messages":[
-                  {"role":"system",
-                   "content":"<IMAGE_HEAT> Predict image & decoration layout."},
-                  {"role":"user","content":"\n".join(user_lines)},
-                  {"role":"assistant","content":""}
-                ]}, ensure_ascii=False)+"\n")
-            rows += 1
-    print(f"Wrote {rows} posters → {dst}")
+def main(src, dst, workers=None, mode="image_deco", dst_image=DST_IMAGE_FILE):
+    files = json_files(src)
+    dsts  = [dst, dst_image] if mode == "both" else [dst]
+    _init_worker(HX, HY, SIGMA, mode)
+    if workers == 1:
+        rows = write_lines(dsts, map(poster_line, files))
+    else:                        # parse + grids in worker processes
+        with ProcessPoolExecutor(workers, initializer=_init_worker,
+                                 initargs=(HX, HY, SIGMA, mode)) as pool:
+            rows = write_lines(dsts, pool.map(poster_line, files, chunksize=64))
+    print(f"Wrote {rows} posters → {', '.join(dsts)}")
 
 # ── CLI entry ─────────────────────────────────────────────────────────────
 if __name__ == "__main__":
@@ -87,8 +188,15 @@ if __name__ == "__main__":
     ap.add_argument("--grid", nargs=2, type=int, metavar=("HX","HY"),
                     help="Grid cols rows (default 12 21)")
     ap.add_argument("--sigma", type=float, help="Blur sigma (default 1.0)")
+    ap.add_argument("--workers", type=int, default=None,
+                    help="Worker processes (default: all cores, 1 = serial)")
+    ap.add_argument("--mode", choices=MODES, default="image_deco",
+                    help="image_deco: separate grids (default); image_only: "
+                         "one merged grid; both: write both datasets")
+    ap.add_argument("--dst-image", default=DST_IMAGE_FILE,
+                    help="Merged-grid JSONL for --mode both")
     args = ap.parse_args()
 
     if args.grid: HX, HY = args.grid
     if args.sigma is not None: globals()["SIGMA"] = args.sigma
-    main(args.src, args.dst)
+    main(args.src, args.dst, args.workers, args.mode, args.dst_image)
@@ -1,41 +1,85 @@
+import argparse
 import json
 import os
+import struct
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+import numpy as np
 from PIL import Image
 
+# optional fast JSON for the OCR lines (falls back to the stdlib)
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
+
 # INPUT and OUTPUT folders
 image_folder = Path("E:/SIA_works/PosterDatabase/PosterDataset")
 jsonl_folder = Path("E:/SIA_works/PosterDatabase/GCV_outputs_Unfiltered_MAY12/jsonl")
 output_folder = Path("E:/SIA_works/PosterDatabase/outputs/labelstudio_github_linked")
-output_folder.mkdir(parents=True, exist_ok=True)
 
 # GitHub raw base URL
 GITHUB_RAW_BASE = "https://raw.githubusercontent.com/JiaheZhaoWustl/PosterDatabase/main/PosterDataset"
 
-for jsonl_file in jsonl_folder.glob("*.jsonl"):
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+
+def image_size(image_path):
+    """(width, height) of an image; PNGs are read straight from the IHDR chunk.
+
+    The first 24 bytes of a PNG are the signature, the IHDR chunk header and
+    the big-endian width/height, so one small read replaces a PIL open.
+    Anything that is not a well-formed PNG header falls back to PIL.
+    """
+    with open(image_path, "rb") as f:
+        head = f.read(24)
+    if len(head) == 24 and head[:8] == PNG_SIGNATURE and head[12:16] == b"IHDR":
+        return struct.unpack(">II", head[16:24])
+    with Image.open(image_path) as img:
+        return img.size
+
+
+def bbox_extents(lines):
+    """Per-item (x0, y0, x1, y1) lists of the OCR polygon bounds.
+
+    All boxes normally have the same number of points, so the mins/maxes are
+    four reductions over one (N, P, 2) array; ragged input uses the per-box loop.
+    """
+    try:
+        pts = np.asarray([item["bbox"] for item in lines], dtype=float)
+    except ValueError:                      # ragged: boxes with differing point counts
+        pts = None
+    if pts is not None and pts.ndim == 3 and pts.shape[1] and pts.shape[2] >= 2:
+        xs, ys = pts[:, :, 0], pts[:, :, 1]
+        return (xs.min(1).tolist(), ys.min(1).tolist(),
+                xs.max(1).tolist(), ys.max(1).tolist())
+    boxes = [item["bbox"] for item in lines]
+    return ([min(p[0] for p in box) for box in boxes],
+            [min(p[1] for p in box) for box in boxes],
+            [max(p[0] for p in box) for box in boxes],
+            [max(p[1] for p in box) for box in boxes])
+
+
+def convert_one(jsonl_file):
+    """Convert one OCR .jsonl into a Label Studio task file; return a status line."""
     base = jsonl_file.stem
     style = base.split("_")[0]
     image_name = base.split("_", 1)[1] + ".png"
     image_path = image_folder / style / image_name
     if not image_path.exists():
-        print(f"⚠️ Image not found for {base}")
-        continue
+        return f"⚠️ Image not found for {base}"
 
     # Read OCR boxes
-    with open(jsonl_file, "r", encoding="utf-8") as f:
-        lines = [json.loads(line) for line in f.readlines()]
+    with open(jsonl_file, "rb") as f:
+        lines = [_loads(line) for line in f]
 
     # Load image dimensions
-    with Image.open(image_path) as img:
-        img_w, img_h = img.size
+    img_w, img_h = image_size(image_path)
 
     results = []
-    for item in lines:
-        box = item["bbox"]
-        x0 = min(p[0] for p in box)
-        y0 = min(p[1] for p in box)
-        x1 = max(p[0] for p in box)
-        y1 = max(p[1] for p in box)
+    for x0, y0, x1, y1 in zip(*bbox_extents(lines)):
         width = x1 - x0
         height = y1 - y0
 
@@ -70,4 +114,24 @@ for jsonl_file in jsonl_folder.glob("*.jsonl"):
     with open(out_path, "w", encoding="utf-8") as f:
         json.dump(ls_data, f, indent=2)
 
-    print(f"✅ Converted: {out_path}")
+    return f"✅ Converted: {out_path}"
+
+
+def main(workers=None):
+    output_folder.mkdir(parents=True, exist_ok=True)
+    files = sorted(jsonl_folder.glob("*.jsonl"))
+    if workers == 1:
+        for msg in map(convert_one, files):
+            print(msg)
+        return
+    # every file is independent: parse + convert in worker processes
+    with ProcessPoolExecutor(workers or os.cpu_count()) as pool:
+        for msg in pool.map(convert_one, files, chunksize=16):
+            print(msg)
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Convert OCR jsonl boxes to Label Studio tasks.")
+    ap.add_argument("--workers", type=int, default=None,
+                    help="Worker processes (default: all cores, 1 = serial)")
+    main(ap.parse_args().workers)
@@ -9,14 +9,35 @@ from __future__ import annotations
 import argparse
 import json
 import os
-from typing import Any, Dict, List
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
 
 import numpy as np
-import matplotlib.pyplot as plt
-from scipy.ndimage import gaussian_filter
+import matplotlib
+from PIL import Image
+from scipy.ndimage import correlate1d
+from scipy.signal import fftconvolve
+
+# Optional parallel Numba stamping kernel (falls back to the NumPy difference array)
+try:
+    from _stamp_numba import stamp_boxes
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+
+# Optional CuPy GPU blur (falls back to the CPU separable blur)
+try:
+    import cupy as cp
+    from cupyx.scipy.ndimage import gaussian_filter as gpu_gaussian_filter
+    HAS_CUPY = True
+except ImportError:
+    HAS_CUPY = False
 
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 
+# From this sigma up, the FFT blur beats the direct ~8·sigma-tap convolution
+FFT_BLUR_MIN_SIGMA = 8.0
+
 DEFAULT_CATEGORY_FILES = [
     "Title.json",
     "Location.json",
@@ -37,17 +58,68 @@ def add_boxes_to_heatmap(
     boxes: List[Dict[str, Any]],
     grid_width: int,
     grid_height: int,
+    use_numba: bool = False,
 ) -> None:
-    for box in boxes:
-        x0 = int(float(box["x"]) / 100.0 * grid_width)
-        y0 = int(float(box["y"]) / 100.0 * grid_height)
-        x1 = int((float(box["x"]) + float(box["width"])) / 100.0 * grid_width)
-        y1 = int((float(box["y"]) + float(box["height"])) / 100.0 * grid_height)
-
-        x0, x1 = max(0, min(x0, grid_width - 1)), max(0, min(x1, grid_width))
-        y0, y1 = max(0, min(y0, grid_height - 1)), max(0, min(y1, grid_height))
-
-        heatmap[y0:y1, x0:x1] += 1.0
+    if not boxes:
+        return
+    b = np.array([(box["x"], box["y"], box["width"], box["height"]) for box in boxes], dtype=float)
+    x0 = np.clip((b[:, 0] / 100.0 * grid_width).astype(int), 0, grid_width - 1)
+    y0 = np.clip((b[:, 1] / 100.0 * grid_height).astype(int), 0, grid_height - 1)
+    x1 = np.clip(((b[:, 0] + b[:, 2]) / 100.0 * grid_width).astype(int), 0, grid_width)
+    y1 = np.clip(((b[:, 1] + b[:, 3]) / 100.0 * grid_height).astype(int), 0, grid_height)
+    keep = (x1 > x0) & (y1 > y0)
+    x0, y0, x1, y1 = x0[keep], y0[keep], x1[keep], y1[keep]
+    if use_numba and HAS_NUMBA:
+        stamp_boxes(heatmap, x0, y0, x1, y1)
+        return
+
+    # +1/-1 on each box's four corners; the 2-D prefix sum is the coverage count
+    delta = np.zeros((grid_height + 1, grid_width + 1), dtype=np.int32)
+    np.add.at(delta, (y0, x0), 1)
+    np.add.at(delta, (y0, x1), -1)
+    np.add.at(delta, (y1, x0), -1)
+    np.add.at(delta, (y1, x1), 1)
+    np.cumsum(delta, axis=0, out=delta)
+    np.cumsum(delta, axis=1, out=delta)
+    heatmap += delta[:grid_height, :grid_width]
+
+
+@lru_cache(maxsize=None)
+def gaussian_taps(sigma: float) -> np.ndarray:
+    """scipy's gaussian_filter1d kernel (truncate=4) as float32, built once per sigma."""
+    radius = int(4.0 * sigma + 0.5)
+    taps = np.exp(-0.5 * (np.arange(-radius, radius + 1) / sigma) ** 2)
+    return (taps / taps.sum()).astype(np.float32)
+
+
+def blur_heatmap(heatmap: np.ndarray, sigma: float) -> np.ndarray:
+    """gaussian_filter(heatmap, sigma) in float32, as two separable 1-D passes.
+
+    The integer count grid is converted to float32 once here, not during stamping.
+
+    Small sigma correlates directly per axis (what gaussian_filter1d does); large
+    sigma uses FFT convolutions over symmetric padding, scipy's 'reflect' boundary.
+    Both share the cached kernel, so results match gaussian_filter to rounding error.
+    """
+    if sigma <= 0:  # no blur, like gaussian_filter(sigma=0)
+        return heatmap.astype(np.float32)
+    heatmap = np.asarray(heatmap, dtype=np.float32)
+    taps = gaussian_taps(float(sigma))
+    if sigma < FFT_BLUR_MIN_SIGMA:
+        out = correlate1d(heatmap, taps, axis=0, mode="reflect")
+        return correlate1d(out, taps, axis=1, mode="reflect")
+    radius = taps.size // 2
+    padded = np.pad(heatmap, radius, mode="symmetric")
+    padded = fftconvolve(padded, taps[None, :], mode="valid", axes=1)
+    return fftconvolve(padded, taps[:, None], mode="valid", axes=0)
+
+
+def blur_heatmap_gpu(heatmap: np.ndarray, sigma: float) -> np.ndarray:
+    """blur_heatmap on the GPU: one upload, cupyx gaussian_filter in float32, one download."""
+    if sigma <= 0:
+        return heatmap.astype(np.float32)
+    heat = cp.asarray(heatmap, dtype=cp.float32)
+    return gpu_gaussian_filter(heat, sigma, mode="reflect", truncate=4.0).get()
 
 
 def render_heatmap(
@@ -57,6 +129,12 @@ def render_heatmap(
     transparent: bool,
     no_show: bool,
 ) -> None:
+    if no_show:
+        # Batch save only: pin Agg before pyplot is first imported so no GUI toolkit starts
+        matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    plt.rcParams.update({"path.simplify": True, "agg.path.chunksize": 10000})
     fig, ax = plt.subplots(figsize=(10, 18))
     if transparent:
         fig.patch.set_facecolor("none")
@@ -74,6 +152,32 @@ def render_heatmap(
         plt.show()
 
 
+def render_heatmap_fast(
+    heatmap: np.ndarray,
+    output_path: str,
+    cmap: str,
+    transparent: bool,
+    size: Optional[Tuple[int, int]] = None,
+) -> None:
+    """Colour-map the heatmap and write it as a PNG with Pillow, one pixel per cell.
+
+    The array is min/max normalised like imshow, mapped through the colormap LUT,
+    and (if `transparent`) given the normalised heat as its alpha channel.
+    `size` = (width, height) bilinearly resizes the image, e.g. after --downscale.
+    """
+    lo, hi = float(heatmap.min()), float(heatmap.max())
+    norm = (heatmap - lo) / (hi - lo) if hi > lo else np.zeros_like(heatmap)
+    rgba = matplotlib.colormaps[cmap](norm, bytes=True)
+    if transparent:
+        rgba[..., 3] = np.round(norm * 255).astype(np.uint8)
+    img = Image.fromarray(rgba, mode="RGBA")
+    if size is not None and img.size != size:
+        img = img.resize(size, Image.BILINEAR)
+
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    img.save(output_path, compress_level=1)  # zlib level 1: ~4× faster, slightly larger file
+
+
 def main() -> None:
     parser = argparse.ArgumentParser(description="Render a combined heatmap from multiple category JSON files.")
     parser.add_argument(
@@ -90,17 +194,52 @@ def main() -> None:
     parser.add_argument("--grid-width", type=int, default=1080)
     parser.add_argument("--grid-height", type=int, default=1920)
     parser.add_argument("--sigma", type=float, default=15.0)
+    parser.add_argument(
+        "--downscale",
+        type=int,
+        default=1,
+        help="Accumulate and blur on a grid k× smaller per axis (sigma / k); imshow upsamples it bilinearly.",
+    )
     parser.add_argument("--cmap", default="plasma")
     parser.add_argument("--transparent", action="store_true", default=True)
     parser.add_argument("--no-show", action="store_true", default=False)
+    parser.add_argument(
+        "--fast-render",
+        action="store_true",
+        help="Write the colour-mapped grid directly with Pillow (grid-sized PNG, no matplotlib figure).",
+    )
+    parser.add_argument(
+        "--numba",
+        action="store_true",
+        help="Stamp boxes with the parallel Numba kernel in _stamp_numba.py (pays off on many cores).",
+    )
+    parser.add_argument(
+        "--gpu",
+        action="store_true",
+        help="Blur on a CUDA GPU with CuPy (cupyx.scipy.ndimage.gaussian_filter).",
+    )
     args = parser.parse_args()
-
-    heatmap = np.zeros((args.grid_height, args.grid_width), dtype=float)
+    if args.numba and not HAS_NUMBA:
+        print("numba is not installed; using the NumPy box stamping instead.")
+    if args.gpu and not HAS_CUPY:
+        print("cupy is not installed; blurring on the CPU instead.")
+
+    k = max(1, args.downscale)
+    grid_width, grid_height = max(1, args.grid_width // k), max(1, args.grid_height // k)
+    heatmap = np.zeros((grid_height, grid_width), dtype=np.int32)  # box counts; float32 only for the blur
     for path in args.inputs:
-        add_boxes_to_heatmap(heatmap, load_boxes(path), args.grid_width, args.grid_height)
+        add_boxes_to_heatmap(heatmap, load_boxes(path), grid_width, grid_height, args.numba)
 
-    smoothed = gaussian_filter(heatmap, sigma=args.sigma)
-    render_heatmap(smoothed, args.output, args.cmap, args.transparent, args.no_show)
+    # The blur is linear, so the categories' summed grid is blurred once rather than per category
+    if args.gpu and HAS_CUPY:
+        smoothed = blur_heatmap_gpu(heatmap, args.sigma / k)
+    else:
+        smoothed = blur_heatmap(heatmap, args.sigma / k)
+    if args.fast_render:
+        size = (args.grid_width, args.grid_height)
+        render_heatmap_fast(smoothed, args.output, args.cmap, args.transparent, size)
+    else:
+        render_heatmap(smoothed, args.output, args.cmap, args.transparent, args.no_show)
 
 
 if __name__ == "__main__":
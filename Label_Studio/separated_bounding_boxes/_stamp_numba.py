@@ -0,0 +1,35 @@
+"""
+_stamp_numba.py
+---------------
+Optional Numba kernel for stamping bounding boxes into a heatmap.
+
+Importing this module raises ImportError when numba is not installed; the
+heatmap scripts catch that and keep their NumPy difference-array stamping.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+from numba import njit, prange
+
+
+@njit(parallel=True, cache=True)
+def _stamp_rows(heatmap, x0, y0, x1, y1):
+    # Parallel over rows rather than boxes: every thread owns its rows, so
+    # overlapping boxes never race on the same cell.
+    for y in prange(heatmap.shape[0]):
+        row = heatmap[y]
+        for i in range(x0.shape[0]):
+            if y0[i] <= y < y1[i]:
+                row[x0[i] : x1[i]] += 1
+
+
+def stamp_boxes(heatmap: np.ndarray, x0: np.ndarray, y0: np.ndarray, x1: np.ndarray, y1: np.ndarray) -> None:
+    """Add 1 to heatmap[y0:y1, x0:x1] for every box, in place (clipped int corners)."""
+    _stamp_rows(
+        heatmap,
+        np.ascontiguousarray(x0, dtype=np.int32),
+        np.ascontiguousarray(y0, dtype=np.int32),
+        np.ascontiguousarray(x1, dtype=np.int32),
+        np.ascontiguousarray(y1, dtype=np.int32),
+    )
@@ -13,10 +13,11 @@ from __future__ import annotations
 import argparse
 import json
 import os
+import re
 from typing import Dict
 
 import numpy as np
-import matplotlib.pyplot as plt
+import matplotlib
 
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 
@@ -40,23 +41,33 @@ LABELS_ORDER = [
     "Text descriptions/details",
 ]
 
+# One pass over the whole user block: anchored on a known tag at line start
+# (after any indentation), capturing the rest of that line as the number payload.
+TAG_LINE_RE = re.compile(
+    r"^[ \t]*(" + "|".join(map(re.escape, CANONICAL_MAP)) + r")[ \t]+([^\r\n]*)",
+    re.MULTILINE | re.IGNORECASE,
+)
+
+# Row of each label in the stacked (len(LABELS_ORDER), hy, hx) accumulator
+LABEL_INDEX = {lbl: i for i, lbl in enumerate(LABELS_ORDER)}
+
 
 def parse_user_block(user_content: str) -> Dict[str, np.ndarray]:
-    """Parse the user content into {label: flattened_vector} for known tags."""
-    out: Dict[str, np.ndarray] = {}
-    for part in user_content.splitlines():
-        bits = part.strip().split()
-        if len(bits) < 2:
-            continue
-        tag = bits[0].lower()
-        if tag not in CANONICAL_MAP:
-            continue
-        out[CANONICAL_MAP[tag]] = np.asarray(list(map(float, bits[1:])), dtype=float)
-    return out
+    """Parse the user content into {label: flattened_vector} for known tags.
+
+    A single precompiled regex lexes the block (no splitlines / per-line
+    split), so unknown lines are never materialised; the numbers are parsed
+    in C by np.fromstring (text mode) straight into a float32 vector.
+    """
+    return {
+        CANONICAL_MAP[m.group(1).lower()]: np.fromstring(m.group(2), dtype=np.float32, sep=" ")
+        for m in TAG_LINE_RE.finditer(user_content)
+    }
 
 
 def main(jsonl_path: str, hx: int, hy: int, output: str | None, no_show: bool, transparent: bool) -> None:
-    sums = {lbl: np.zeros((hy, hx), dtype=float) for lbl in set(CANONICAL_MAP.values())}
+    # one contiguous float32 tensor for all categories instead of a dict of grids
+    sums = np.zeros((len(LABELS_ORDER), hy, hx), dtype=np.float32)
     doc_count = 0
 
     with open(jsonl_path, encoding="utf-8") as f:
@@ -69,21 +80,26 @@ def main(jsonl_path: str, hx: int, hy: int, output: str | None, no_show: bool, t
             for lbl, vec in parsed.items():
                 if vec.size != hx * hy:
                     continue
-                sums[lbl] += vec.reshape(hy, hx)
+                sums[LABEL_INDEX[lbl]] += vec.reshape(hy, hx)
             doc_count += 1
 
-    for k in sums:
-        sums[k] /= max(doc_count, 1)
+    sums /= max(doc_count, 1)
+
+    if no_show:
+        # Batch save only: pin Agg before pyplot is first imported so no GUI toolkit starts
+        matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
 
+    plt.rcParams.update({"path.simplify": True, "agg.path.chunksize": 10000})
     fig, axes = plt.subplots(2, 3, figsize=(9, 6))
     if transparent:
         fig.patch.set_facecolor("none")
     axes = axes.flatten()
 
-    for ax, lbl in zip(axes, LABELS_ORDER):
+    for ax, heat in zip(axes, sums):
         if transparent:
             ax.set_facecolor("none")
-        ax.imshow(sums[lbl], origin="upper", aspect="auto", cmap="plasma")
+        ax.imshow(heat, origin="upper", aspect="auto", cmap="plasma")
         ax.axis("off")
 
     if output:
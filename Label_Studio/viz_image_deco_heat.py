@@ -1,8 +1,9 @@
 #!/usr/bin/env python
 # viz_image_deco_heat.py  —  aggregate "Image" / "Decoration" polygons to a 12×21 heat-map
 # -------------------------------------------------------------------------------
-import json, glob, pathlib, argparse, numpy as np, matplotlib.pyplot as plt
-from PIL import Image, ImageDraw
+import json, glob, os, pathlib, argparse, numpy as np, matplotlib.pyplot as plt
+from concurrent.futures import ProcessPoolExecutor
+import cv2
 from scipy.ndimage import gaussian_filter
 
 # ── config ─────────────────────────────────────────────────────────────
@@ -12,27 +13,35 @@ HX, HY = 12, 21
 SIGMA  = 1.0                              # blur in grid cells
 OUT_PNG   = "validation_heat.png"
 OUT_TXT   = "validation_heat.txt"
+ROW_FMT   = " ".join(["%.1f"] * (HX * HY))   # one %-format for the 252-float line
 # ----------------------------------------------------------------------
 
+FILL_SHIFT = 8                            # cv2.fillPoly fixed-point bits (1/256 px)
+
 def raster_polygons(w, h, polys):
     """polys: list of list[(x%,y%)]  →  boolean mask (H,W)"""
-    mask = Image.new("1", (w, h), 0)
-    d    = ImageDraw.Draw(mask)
+    mask  = np.zeros((h, w), np.uint8)
+    # % → px in fixed point; the -0.5 moves to OpenCV's pixel-centre
+    # convention so edges land where PIL's ImageDraw.polygon put them
+    scale = np.array([w/100, h/100]) * (1 << FILL_SHIFT)
+    shift = 0.5 * (1 << FILL_SHIFT)
     for poly in polys:
-        # convert % to px
-        pts = [(x/100*w, y/100*h) for x,y in poly]
-        d.polygon(pts, fill=1)
-    return np.array(mask, dtype="float32")
+        # one fillPoly per polygon: a single call with several contours
+        # applies even-odd filling and would punch holes where two overlap
+        pts = np.round(np.asarray(poly, float) * scale - shift).astype(np.int32)
+        cv2.fillPoly(mask, [pts], 1, cv2.LINE_8, FILL_SHIFT)
+    return mask.astype(np.float32)
 
 def downsample(arr, hx, hy):
+    """(H,W) mask → (hy,hx) cell means, cell edges at int(i*H/hy) / int(i*W/hx)"""
     H, W = arr.shape
-    g = np.zeros((hy, hx))
-    for gy in range(hy):
-        for gx in range(hx):
-            y0,y1 = int(gy*H/hy), int((gy+1)*H/hy)
-            x0,x1 = int(gx*W/hx), int((gx+1)*W/hx)
-            g[gy, gx] = arr[y0:y1, x0:x1].mean()
-    return g
+    ys = (np.arange(hy + 1) * H / hy).astype(int)
+    xs = (np.arange(hx + 1) * W / hx).astype(int)
+    # block sums along each row, then down the columns – two C calls instead of
+    # hy×hx slice means (0/1 mask counts stay exact in float32)
+    sums = np.add.reduceat(arr, xs[:-1], axis=1)
+    sums = np.add.reduceat(sums, ys[:-1], axis=0)
+    return sums / np.outer(np.diff(ys), np.diff(xs))
 
 def process_file(jf):
     js = json.load(open(jf, encoding="utf-8"))
@@ -54,14 +63,24 @@ def process_file(jf):
     mask = raster_polygons(origW, origH, polys)
     return downsample(mask, HX, HY)
 
-def main():
+def accumulate(grids):
     acc = np.zeros((HY, HX))
     posters = 0
-    for jf in glob.glob(str(pathlib.Path(FOLDER) / "*.json")):
-        g = process_file(jf)
+    for g in grids:
         if g is not None:
             acc += g
             posters += 1
+    return acc, posters
+
+def main(workers=None):
+    files = glob.glob(str(pathlib.Path(FOLDER) / "*.json"))
+    if workers == 1:
+        acc, posters = accumulate(map(process_file, files))
+    else:
+        # posters are independent: parse + rasterise in workers, only the
+        # small (HY,HX) grids come back; map keeps file order for the sum
+        with ProcessPoolExecutor(workers or os.cpu_count()) as ex:
+            acc, posters = accumulate(ex.map(process_file, files, chunksize=8))
     if posters == 0:
         print("No Image/Decoration polygons found"); return
     heat = gaussian_filter(acc / posters, sigma=SIGMA)
@@ -77,9 +96,12 @@ def main():
     print(f"★ Heat-map PNG → {OUT_PNG}")
 
     # write 252-float line
-    flat = " ".join(f"{v:.1f}" for v in heat.flatten())
+    flat = ROW_FMT % tuple(heat.ravel().tolist())
     pathlib.Path(OUT_TXT).write_text(flat, encoding="utf-8")
     print(f"★ occ_heat line (252 floats) → {OUT_TXT}")
 
 if __name__ == "__main__":
-    main()
+    ap = argparse.ArgumentParser(description="Aggregate Image/Decoration polygons to a heat-map.")
+    ap.add_argument("--workers", type=int, default=None,
+                    help="Worker processes (default: all cores, 1 = serial)")
+    main(ap.parse_args().workers)
@@ -72,11 +72,22 @@ def draw_boxes(ax, rects_pct, W, H):
 
 def rects_to_heat(rects_pct, hx, hy):
     g = np.zeros((hy, hx))
-    for x, y, w, h in rects_pct:
-        x1, y1 = x + w, y + h
-        gx0, gx1 = int(x / (100 / hx)), int(x1 / (100 / hx))
-        gy0, gy1 = int(y / (100 / hy)), int(y1 / (100 / hy))
-        g[gy0 : gy1 + 1, gx0 : gx1 + 1] = 1
+    if rects_pct:
+        r = np.asarray(rects_pct, dtype=float)      # (N,4) x, y, w, h in %
+        # cell spans [g0, g1] inclusive → half-open [g0, g1+1), clipped to the grid
+        gx0 = np.clip((r[:, 0] / (100 / hx)).astype(int), 0, hx)
+        gy0 = np.clip((r[:, 1] / (100 / hy)).astype(int), 0, hy)
+        gx1 = np.clip(((r[:, 0] + r[:, 2]) / (100 / hx)).astype(int) + 1, 0, hx)
+        gy1 = np.clip(((r[:, 1] + r[:, 3]) / (100 / hy)).astype(int) + 1, 0, hy)
+        keep = (gx1 > gx0) & (gy1 > gy0)
+        gx0, gy0, gx1, gy1 = gx0[keep], gy0[keep], gx1[keep], gy1[keep]
+        # corner deltas + 2-D prefix sum = coverage count; >0 is the old "= 1"
+        d = np.zeros((hy + 1, hx + 1), dtype=np.int32)
+        np.add.at(d, (gy0, gx0), 1)
+        np.add.at(d, (gy0, gx1), -1)
+        np.add.at(d, (gy1, gx0), -1)
+        np.add.at(d, (gy1, gx1), 1)
+        g[:] = d.cumsum(0).cumsum(1)[:hy, :hx] > 0
     g = gaussian_filter(g, SIGMA)
     if g.max() > 0:
         g /= g.max()
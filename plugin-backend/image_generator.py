@@ -4,16 +4,58 @@
 # 1. DALL-E (OpenAI) - Recommended for prototyping
 # 2. Stable Diffusion (via Replicate or Hugging Face)
 # 3. Third-party Midjourney APIs (if available)
+#
+# The generators are coroutines. They all run on one background event loop that
+# owns a shared httpx.AsyncClient (HTTP/2 when h2 is installed), so TLS/DNS setup
+# is paid once, downloads from one CDN share a multiplexed connection, and many
+# generations can be in flight per process. Sync callers use generate_image().
 
 import os
+import hmac
+import json
+import atexit
+import asyncio
+import hashlib
+import struct
+import time
+import inspect
+import functools
+import threading
 import openai
-import requests
-import base64
+import httpx
+import binascii
 from io import BytesIO
+from types import MappingProxyType
 from PIL import Image
 from dotenv import load_dotenv
+from cachetools import TTLCache
+from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_exponential
 import logging
 
+# Optional fast hashing / canonical JSON for the generation cache keys
+try:
+    import blake3
+    def _digest(data: bytes) -> str:
+        return blake3.blake3(data).hexdigest(length=16)
+except ImportError:
+    def _digest(data: bytes) -> str:
+        return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+try:
+    import orjson
+    def _canonical_json(obj) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_SORT_KEYS)
+except ImportError:
+    def _canonical_json(obj) -> bytes:
+        return json.dumps(obj, sort_keys=True, separators=(",", ":")).encode("utf-8")
+
+# HTTP/2 multiplexing needs the h2 package (pip install "httpx[http2]")
+try:
+    import h2  # noqa: F401
+    HAS_HTTP2 = True
+except ImportError:
+    HAS_HTTP2 = False
+
 # Try to import replicate (optional)
 try:
     import replicate
@@ -23,223 +65,714 @@ except ImportError:
 
 load_dotenv()
 logging.basicConfig(level=logging.INFO)
+logging.getLogger("httpx").setLevel(logging.WARNING)  # no INFO line per download / poll
 
 # Configuration
 DEFAULT_PROVIDER = os.getenv("IMAGE_GEN_PROVIDER", "dalle")  # "dalle", "replicate", "midjourney_api"
 
 # Fast model recommendations for Replicate
-FAST_REPLICATE_MODELS = {
+FAST_REPLICATE_MODELS = MappingProxyType({
     "flux-schnell": "black-forest-labs/flux-schnell",  # 2-5 seconds, very fast
     "flux-dev": "black-forest-labs/flux-dev",  # 5-10 seconds, high quality
     "sdxl": "stability-ai/sdxl",  # 5-15 seconds, standard
-}
+})
+
+class ImageGenError(Exception):
+    """Base class for errors raised by the image generators."""
+
+class ImageGenTransientError(ImageGenError):
+    """Worth retrying: timeout, connection failure, rate limit, provider 5xx."""
+
+class ImageGenPermanentError(ImageGenError):
+    """Retrying will not help: bad prompt/params, auth or config, generation failed."""
+
+DOWNLOAD_TIMEOUT = 30.0  # seconds
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+DOWNLOAD_HEADERS = {"Accept-Encoding": "identity"}  # PNG/WebP are already compressed
+DOWNLOAD_RETRIES = 2
+DOWNLOAD_RETRY_BACKOFF = 0.25  # seconds, doubled per retry
+DOWNLOAD_RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+# Midjourney status polling: exponential backoff, optional server-side long poll
+POLL_INITIAL_DELAY = 0.5
+POLL_MAX_DELAY = 5.0
+MIDJOURNEY_POLL_WAIT = int(os.getenv("MIDJOURNEY_POLL_WAIT", "0"))
+
+# Midjourney completion webhook (server.py exposes POST /mj/callback); polling is
+# only used when no public callback URL is configured
+MIDJOURNEY_WEBHOOK_URL = os.getenv("MIDJOURNEY_WEBHOOK_URL")
+MIDJOURNEY_WEBHOOK_SECRET = os.getenv("MIDJOURNEY_WEBHOOK_SECRET")
+if MIDJOURNEY_WEBHOOK_URL and not MIDJOURNEY_WEBHOOK_SECRET:
+    logging.warning("MIDJOURNEY_WEBHOOK_URL is set without MIDJOURNEY_WEBHOOK_SECRET; "
+                    "ignoring it and polling instead")
+    MIDJOURNEY_WEBHOOK_URL = None
+EARLY_CALLBACK_TTL = 60  # seconds a callback may wait for its task to be registered
+EARLY_CALLBACK_MAX = 256
+
+# LOG_TIMING=0 skips the per-generation clock reads and timing log lines
+LOG_TIMING = os.getenv("LOG_TIMING", "1").lower() not in ("0", "false", "no")
+
+# PREWARM=1 opens the connections a first generation needs (OpenAI API, Replicate's
+# image CDN, the Midjourney API host) in the background at import time
+PREWARM = os.getenv("PREWARM", "").lower() in ("1", "true", "yes")
+PREWARM_TIMEOUT = 2.0  # seconds
+PREWARM_URLS = ("https://replicate.delivery/",)
+
+# Generated images keyed by a hash of (generator, prompt, params); sized in bytes
+IMAGE_CACHE_TTL = int(os.getenv("IMAGE_CACHE_TTL", "3600"))  # seconds, 0 disables the cache
+IMAGE_CACHE_MAX_BYTES = int(os.getenv("IMAGE_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+# Shared I/O loop (daemon thread) and the clients bound to it, created lazily
+_loop = None
+_loop_lock = threading.Lock()
+_http_client = None
+_openai_client = None
+_image_cache = TTLCache(maxsize=IMAGE_CACHE_MAX_BYTES, ttl=max(IMAGE_CACHE_TTL, 1), getsizeof=len)
+_inflight = {}  # cache key -> Task of the generation in progress
+
+# Midjourney task_id -> Future resolved by the webhook, plus callbacks that
+# arrived before their task was registered (bounded; unclaimed ones expire).
+# Both are only touched on _loop.
+_pending_callbacks = {}
+_early_callbacks = TTLCache(maxsize=EARLY_CALLBACK_MAX, ttl=EARLY_CALLBACK_TTL)
 
-def generate_with_dalle(prompt: str, size: str = "1024x1024", quality: str = "standard") -> bytes:
+
+def _get_loop() -> asyncio.AbstractEventLoop:
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="image-generator-io", daemon=True).start()
+    return _loop
+
+
+def _on_io_loop(fn):
+    """Run the coroutine on the shared I/O loop, whichever event loop awaits it.
+
+    The pooled connections of _http_client belong to the loop that opened them, so
+    every coroutine that touches the client hops onto _loop first.
+    """
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        loop = _get_loop()
+        if asyncio.get_running_loop() is loop:
+            return await fn(*args, **kwargs)
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(fn(*args, **kwargs), loop))
+    return wrapper
+
+
+def _cached_generation(fn):
+    """Serve repeat requests for the same generator + prompt + params from _image_cache,
+    and coalesce identical concurrent requests into one upstream call (single flight).
+
+    Defaults are bound before hashing, so omitted and explicit default arguments
+    share an entry; api_key is left out of the key. Only used on _loop.
+    """
+    signature = inspect.signature(fn)
+
+    def finish(key: str, task: asyncio.Task) -> None:
+        _inflight.pop(key, None)
+        # exception() also marks a failure as retrieved if every waiter went away
+        if task.cancelled() or task.exception() is not None:
+            return
+        image_bytes = task.result()
+        if IMAGE_CACHE_TTL > 0 and len(image_bytes) <= _image_cache.maxsize:
+            _image_cache[key] = image_bytes
+
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        params = {k: v for k, v in bound.arguments.items() if k != "api_key"}
+        key = _digest(_canonical_json({"generator": fn.__name__, **params}))
+        if IMAGE_CACHE_TTL > 0:
+            image_bytes = _image_cache.get(key)
+            if image_bytes is not None:
+                return image_bytes
+
+        task = _inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn(*args, **kwargs))
+            _inflight[key] = task
+            task.add_done_callback(functools.partial(finish, key))
+        # shield: one caller giving up must not cancel the call the others wait on
+        return await asyncio.shield(task)
+    return wrapper
+
+
+def _get_http_client() -> httpx.AsyncClient:
+    # Only called on _loop
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            http2=HAS_HTTP2,
+            limits=httpx.Limits(max_connections=64, max_keepalive_connections=32),
+            timeout=30.0,
+        )
+    return _http_client
+
+
+@atexit.register
+def _close_http_client() -> None:
+    if _http_client is not None and not _http_client.is_closed:
+        asyncio.run_coroutine_threadsafe(_http_client.aclose(), _loop).result(timeout=5)
+
+
+def _get_openai_client() -> openai.AsyncOpenAI:
+    # Only called on _loop; reads OPENAI_API_KEY from the environment
+    global _openai_client
+    if _openai_client is None:
+        _openai_client = openai.AsyncOpenAI()
+    return _openai_client
+
+
+def _typed_error(e: Exception, submitted: bool = False) -> ImageGenError:
+    """
+    Classify a provider/HTTP exception as transient (retryable) or permanent.
+
+    Once the provider has accepted (and billed) a job, `submitted=True` makes every
+    failure permanent: a retry would start a new job, so polls and downloads after
+    that point retry locally instead.
+    """
+    if submitted:
+        transient = False
+    elif isinstance(e, httpx.HTTPStatusError):
+        status = e.response.status_code
+        transient = status == 429 or status >= 500
+    else:
+        transient = isinstance(e, (
+            httpx.TransportError,  # connect/read errors and timeouts
+            openai.APIConnectionError,  # includes APITimeoutError
+            openai.RateLimitError,
+            openai.InternalServerError,
+        ))
+    error_cls = ImageGenTransientError if transient else ImageGenPermanentError
+    return error_cls(str(e) or type(e).__name__)
+
+
+async def _read_body(response: httpx.Response) -> bytes:
+    # Grow a BytesIO as chunks arrive. Content-Length is deliberately not used to
+    # preallocate: it is whatever the remote server claims, so it can't be trusted
+    # to size a buffer. getvalue() hands back the buffer without a further copy.
+    buf = BytesIO()
+    async for chunk in response.aiter_bytes(DOWNLOAD_CHUNK_SIZE):
+        buf.write(chunk)
+    return buf.getvalue()
+
+
+async def _download(image_url: str) -> bytes:
+    # Stream 64 KB chunks into one buffer (_read_body) rather than letting the response
+    # body and a second copy coexist at peak. Transport errors and 429/5xx are retried
+    # with a short backoff on the pooled client before giving up.
+    for attempt in range(DOWNLOAD_RETRIES + 1):
+        retry_delay = DOWNLOAD_RETRY_BACKOFF * 2 ** attempt
+        try:
+            async with _get_http_client().stream(
+                "GET", image_url, headers=DOWNLOAD_HEADERS, timeout=DOWNLOAD_TIMEOUT
+            ) as img_response:
+                if img_response.status_code in DOWNLOAD_RETRY_STATUSES and attempt < DOWNLOAD_RETRIES:
+                    await asyncio.sleep(retry_delay)
+                    continue
+                img_response.raise_for_status()
+                return await _read_body(img_response)
+        except httpx.TransportError:
+            if attempt == DOWNLOAD_RETRIES:
+                raise
+            await asyncio.sleep(retry_delay)
+
+
+@_on_io_loop
+@_cached_generation
+async def generate_with_dalle(
+    prompt: str, size: str = "1024x1024", quality: str = "standard", prefer_url: bool = False
+) -> bytes:
     """
     Generate image using DALL-E 3 API.
     Requires: OPENAI_API_KEY in environment
-    
+
+    The PNG comes back inline (response_format="b64_json"), saving the second
+    HTTPS round-trip to OpenAI's image CDN; prefer_url=True downloads it from
+    the returned URL instead.
+
     Typical generation time: 3-5 seconds (standard quality)
     HD quality takes longer: 8-12 seconds
     """
+    submitted = False
     try:
-        import time
-        start_time = time.time()
-        logging.info(f"Generating image with DALL-E: {prompt[:50]}...")
-        
+        timed = _timing_enabled()
+        start_time = time.monotonic() if timed else 0.0
+        logging.info("Generating image with DALL-E: %.50s...", prompt)
+
         # Use timeout for API call
-        response = openai.images.generate(
+        response = await _get_openai_client().images.generate(
             model="dall-e-3",
             prompt=prompt,
             size=size,
             quality=quality,  # "standard" is faster than "hd"
             n=1,
+            response_format="url" if prefer_url else "b64_json",
             timeout=60.0  # 60 second timeout
         )
-        
-        generation_time = time.time() - start_time
-        logging.info(f"DALL-E generation took {generation_time:.2f} seconds")
-        
-        image_url = response.data[0].url
-        
-        # Download the image with timeout
-        download_start = time.time()
-        img_response = requests.get(image_url, timeout=30)
-        img_response.raise_for_status()
-        download_time = time.time() - download_start
-        logging.info(f"Image download took {download_time:.2f} seconds")
-        
-        total_time = time.time() - start_time
-        logging.info(f"Total DALL-E process took {total_time:.2f} seconds")
-        
-        return img_response.content
-        
+        submitted = True
+
+        if timed:
+            generated_time = time.monotonic()
+            logging.info("DALL-E generation took %.2f seconds", generated_time - start_time)
+
+        if prefer_url:
+            # Download the image with timeout
+            image_bytes = await _download(response.data[0].url)
+            if timed:
+                logging.info("Image download took %.2f seconds", time.monotonic() - generated_time)
+        else:
+            image_bytes = binascii.a2b_base64(response.data[0].b64_json)
+
+        if timed:
+            logging.info("Total DALL-E process took %.2f seconds", time.monotonic() - start_time)
+
+        return image_bytes
+
     except Exception as e:
-        logging.error(f"DALL-E generation failed: {e}")
-        raise
-def generate_with_replicate(prompt: str, model: str = "stability-ai/sdxl") -> bytes:
+        logging.error("DALL-E generation failed: %s", e)
+        raise _typed_error(e, submitted) from e
+
+@_on_io_loop
+@_cached_generation
+async def generate_with_replicate(
+    prompt: str,
+    model: str = FAST_REPLICATE_MODELS["flux-schnell"],
+    steps: int = 4,
+    output_format: str = "png",
+) -> bytes:
     """
     Generate image using Replicate API (supports Stable Diffusion, Midjourney-like models).
     Requires: REPLICATE_API_TOKEN in environment
-    
-    Typical generation time: 5-15 seconds (varies by model)
-    Faster models available: flux/schnell (2-5 seconds)
+
+    Defaults to flux-schnell (2-5 seconds) at its minimum of 4 inference steps,
+    delivered as PNG (output_format="webp" for clients that can decode it);
+    steps / output_format only apply to flux-schnell.
+    Other models (e.g. sdxl) take 5-15 seconds and get just the prompt.
     """
     if not HAS_REPLICATE:
-        raise ImportError("Replicate module not installed. Install with: pip install replicate")
-    
+        raise ImageGenPermanentError("Replicate module not installed. Install with: pip install replicate")
+
+    submitted = False
     try:
-        import time
-        start_time = time.time()
-        logging.info(f"Generating image with Replicate ({model}): {prompt[:50]}...")
-        
-        output = replicate.run(
+        timed = _timing_enabled()
+        start_time = time.monotonic() if timed else 0.0
+        logging.info("Generating image with Replicate (%s): %.50s...", model, prompt)
+
+        model_input = {"prompt": prompt}
+        if model == FAST_REPLICATE_MODELS["flux-schnell"]:
+            model_input.update(
+                num_inference_steps=steps,
+                aspect_ratio="1:1",
+                output_format=output_format,
+                output_quality=85,
+            )
+
+        # replicate.run blocks until the prediction finishes; keep it off the I/O loop
+        output = await asyncio.to_thread(
+            replicate.run,
             model,
-            input={"prompt": prompt}
+            input=model_input
         )
-        
-        # Replicate returns a URL or list of URLs
+        submitted = True
+
+        # Replicate returns a URL or list of URLs; replicate>=1.0 wraps them in
+        # FileOutput objects, which httpx won't accept as a URL
         if isinstance(output, list):
-            image_url = output[0]
-        else:
-            image_url = output
-        
+            output = output[0]
+        image_url = str(getattr(output, "url", output))
+
         # Download the image with timeout
-        img_response = requests.get(image_url, timeout=30)
-        img_response.raise_for_status()
-        
-        total_time = time.time() - start_time
-        logging.info(f"Total Replicate process took {total_time:.2f} seconds")
-        
-        return img_response.content
-        
+        image_bytes = await _download(image_url)
+
+        if timed:
+            logging.info("Total Replicate process took %.2f seconds", time.monotonic() - start_time)
+
+        return image_bytes
+
     except Exception as e:
-        logging.error(f"Replicate generation failed: {e}")
-        raise
+        logging.error("Replicate generation failed: %s", e)
+        raise _typed_error(e, submitted) from e
+
+def _timing_enabled() -> bool:
+    return LOG_TIMING and logging.getLogger().isEnabledFor(logging.INFO)
+
+def _midjourney_api_url() -> str:
+    return os.getenv("MIDJOURNEY_API_URL", "https://api.midjourneyapi.com/v2/imagine")
 
-def generate_with_midjourney_api(prompt: str, api_key: str = None) -> bytes:
+
+def _deliver_callback(task_id: str, status_data: dict) -> None:
+    future = _pending_callbacks.get(task_id)
+    if future is None:
+        _early_callbacks[task_id] = status_data
+    elif not future.done():
+        future.set_result(status_data)
+
+
+def resolve_midjourney_callback(task_id: str, status_data: dict, secret: str = None) -> bool:
+    """
+    Hand a Midjourney webhook payload to the generation waiting on task_id.
+    Thread-safe (called from the Flask request thread).
+
+    Returns False if the webhook is not enabled (MIDJOURNEY_WEBHOOK_URL and
+    MIDJOURNEY_WEBHOOK_SECRET both set) or `secret` does not match.
+    """
+    if not MIDJOURNEY_WEBHOOK_URL:
+        return False
+    if not hmac.compare_digest(secret or "", MIDJOURNEY_WEBHOOK_SECRET):
+        return False
+    _get_loop().call_soon_threadsafe(_deliver_callback, task_id, status_data)
+    return True
+
+
+async def _wait_for_midjourney_callback(task_id: str, timeout: float) -> dict:
+    status_data = _early_callbacks.pop(task_id, None)
+    if status_data is not None:
+        return status_data
+    future = _get_loop().create_future()
+    _pending_callbacks[task_id] = future
+    try:
+        return await asyncio.wait_for(future, timeout=timeout)
+    finally:
+        _pending_callbacks.pop(task_id, None)
+
+
+@_on_io_loop
+@_cached_generation
+async def generate_with_midjourney_api(prompt: str, api_key: str = None) -> bytes:
     """
     Generate image using third-party Midjourney API service.
     This is a placeholder - you'll need to integrate with a specific service.
-    
+
     Example services:
     - Midjourney API (midjourneyapi.com)
     - Imagine API
     - Other third-party services
-    
+
     Requires: MIDJOURNEY_API_KEY in environment
+    Optional: MIDJOURNEY_WEBHOOK_URL (+ MIDJOURNEY_WEBHOOK_SECRET) to be called back
+    on completion instead of polling
     """
+    submitted = False
     try:
         api_key = api_key or os.getenv("MIDJOURNEY_API_KEY")
         if not api_key:
             raise ValueError("MIDJOURNEY_API_KEY not found in environment")
-        
+
         # Example API call structure (adjust based on your chosen service)
-        api_url = os.getenv("MIDJOURNEY_API_URL", "https://api.midjourneyapi.com/v2/imagine")
-        
+        api_url = _midjourney_api_url()
+
         headers = {
             "Authorization": f"Bearer {api_key}",
             "Content-Type": "application/json"
         }
-        
+
         payload = {
             "prompt": prompt,
             "aspect_ratio": "1:1",  # Adjust as needed
             "mode": "fast"  # or "relax"
         }
-        
-        logging.info(f"Generating image with Midjourney API: {prompt[:50]}...")
-        
+        if MIDJOURNEY_WEBHOOK_URL:
+            payload["webhook_url"] = MIDJOURNEY_WEBHOOK_URL
+            payload["webhook_secret"] = MIDJOURNEY_WEBHOOK_SECRET
+
+        logging.info("Generating image with Midjourney API: %.50s...", prompt)
+
+        client = _get_http_client()
+
         # Submit generation request
-        response = requests.post(api_url, json=payload, headers=headers)
+        response = await client.post(api_url, json=payload, headers=headers)
         response.raise_for_status()
-        
         result = response.json()
         task_id = result.get("task_id")
-        
-        # Poll for completion (adjust based on API)
-        import time
+        submitted = True
+
         max_wait = 300  # 5 minutes
-        wait_time = 0
-        
-        while wait_time < max_wait:
-            status_response = requests.get(
-                f"{api_url}/{task_id}",
-                headers=headers
-            )
-            status_response.raise_for_status()
-            status_data = status_response.json()
-            
-            if status_data.get("status") == "completed":
-                image_url = status_data.get("image_url")
-                img_response = requests.get(image_url)
-                img_response.raise_for_status()
-                return img_response.content
-            elif status_data.get("status") == "failed":
+
+        if MIDJOURNEY_WEBHOOK_URL:
+            # One callback instead of a poll loop
+            try:
+                status_data = await _wait_for_midjourney_callback(task_id, max_wait)
+            except asyncio.TimeoutError:
+                raise ImageGenPermanentError("Image generation timed out") from None
+            if status_data.get("status") != "completed":
                 raise Exception(f"Generation failed: {status_data.get('error')}")
-            
-            time.sleep(5)
-            wait_time += 5
-        
-        raise TimeoutError("Image generation timed out")
-        
-    except Exception as e:
-        logging.error(f"Midjourney API generation failed: {e}")
+            return await _download(status_data.get("image_url"))
+
+        # Poll for completion (adjust based on API): back off from 0.5s to 5s so a
+        # fast job is noticed quickly and a slow one costs few status requests.
+        # If the service supports long polling, MIDJOURNEY_POLL_WAIT=<seconds> asks it
+        # to hold each status request open until the job finishes or that time passes.
+        deadline = time.monotonic() + max_wait
+        delay = POLL_INITIAL_DELAY
+        params = {"wait": MIDJOURNEY_POLL_WAIT} if MIDJOURNEY_POLL_WAIT else None
+        status_timeout = MIDJOURNEY_POLL_WAIT + 30.0
+
+        while time.monotonic() < deadline:
+            try:
+                status_response = await client.get(
+                    f"{api_url}/{task_id}", headers=headers, params=params, timeout=status_timeout
+                )
+                status_response.raise_for_status()
+            except httpx.HTTPError as e:
+                # A dropped or 429/5xx status check just waits for the next poll;
+                # the job itself is unaffected
+                if isinstance(_typed_error(e), ImageGenPermanentError):
+                    raise
+                logging.warning("Midjourney status check failed, will retry: %s", e)
+            else:
+                status_data = status_response.json()
+                if status_data.get("status") == "completed":
+                    return await _download(status_data.get("image_url"))
+                elif status_data.get("status") == "failed":
+                    raise Exception(f"Generation failed: {status_data.get('error')}")
+
+            # Yield the loop to other in-flight generations while this one waits
+            await asyncio.sleep(min(delay, max(0.0, deadline - time.monotonic())))
+            delay = min(POLL_MAX_DELAY, delay * 1.5)
+
+        # Job-level timeout: retrying would resubmit (and pay for) the whole job
+        raise ImageGenPermanentError("Image generation timed out")
+
+    except ImageGenError as e:
+        logging.error("Midjourney API generation failed: %s", e)
         raise
 
-def generate_image(prompt: str, provider: str = None, **kwargs) -> bytes:
+    except Exception as e:
+        logging.error("Midjourney API generation failed: %s", e)
+        raise _typed_error(e, submitted) from e
+
+# Provider dispatch, built once: each entry returns (image_bytes, known (width, height) or None)
+async def _dispatch_dalle(prompt: str, kwargs: dict):
+    size = kwargs.get("size", "1024x1024")
+    image_bytes = await generate_with_dalle(
+        prompt, size, kwargs.get("quality", "standard"), kwargs.get("prefer_url", False)
+    )
+    return image_bytes, _parse_size(size)
+
+async def _dispatch_replicate(prompt: str, kwargs: dict):
+    image_bytes = await generate_with_replicate(
+        prompt,
+        kwargs.get("model") or FAST_REPLICATE_MODELS["flux-schnell"],
+        kwargs.get("steps", 4),
+        kwargs.get("output_format", "png"),
+    )
+    return image_bytes, None
+
+async def _dispatch_midjourney_api(prompt: str, kwargs: dict):
+    return await generate_with_midjourney_api(prompt, kwargs.get("api_key")), None
+
+_DISPATCH = MappingProxyType({
+    "dalle": _dispatch_dalle,
+    "replicate": _dispatch_replicate,
+    "midjourney_api": _dispatch_midjourney_api,
+})
+
+# Transient failures get two more attempts 0.5-8s apart; permanent ones fail at once.
+# Generators only raise transient errors before a job is accepted, so this never pays twice.
+@retry(
+    retry=retry_if_exception_type(ImageGenTransientError),
+    wait=wait_exponential(multiplier=0.5, min=0.5, max=8),
+    stop=stop_after_attempt(3),
+    reraise=True,
+)
+async def _dispatch_with_retry(dispatch, prompt: str, kwargs: dict):
+    return await dispatch(prompt, kwargs)
+
+@_on_io_loop
+async def generate_image_async(
+    prompt: str, provider: str = None, max_width: int = 2048, max_height: int = 2048, **kwargs
+) -> bytes:
     """
-    Main function to generate images using the specified provider.
-    
+    Async version of generate_image; safe to await from any event loop.
+
     Args:
         prompt: The text prompt for image generation
         provider: "dalle", "replicate", or "midjourney_api"
-        **kwargs: Additional parameters (size, quality, model, etc.)
-    
+        max_width, max_height: The image is downscaled to fit (Figma has size limits)
+        **kwargs: Additional parameters (size, quality, model, output_format, etc.)
+
     Returns:
-        Image bytes (PNG format)
+        Image bytes (PNG or WebP; see image_mime_type)
+
+    Raises:
+        ImageGenTransientError: still failing after the retries (safe to retry later)
+        ImageGenPermanentError: unknown provider, bad request, auth/config, failed job
     """
-    provider = provider or DEFAULT_PROVIDER
-    
     try:
-        if provider == "dalle":
-            size = kwargs.get("size", "1024x1024")
-            quality = kwargs.get("quality", "standard")
-            return generate_with_dalle(prompt, size, quality)
-        
-        elif provider == "replicate":
-            model = kwargs.get("model", "stability-ai/sdxl")
-            return generate_with_replicate(prompt, model)
-        
-        elif provider == "midjourney_api":
-            return generate_with_midjourney_api(prompt, kwargs.get("api_key"))
-        
-        else:
-            raise ValueError(f"Unknown provider: {provider}")
-    
+        try:
+            dispatch = _DISPATCH[provider or DEFAULT_PROVIDER]
+        except KeyError:
+            raise ImageGenPermanentError(f"Unknown provider: {provider or DEFAULT_PROVIDER}") from None
+        image_bytes, known_size = await _dispatch_with_retry(dispatch, prompt, kwargs)
+
     except Exception as e:
-        logging.error(f"Image generation failed: {e}")
+        logging.error("Image generation failed: %s", e)
         raise
 
+    # PIL decode/encode is CPU work; keep it off the I/O loop
+    return await asyncio.to_thread(
+        resize_image, image_bytes, max_width, max_height, known_size, kwargs.get("output_format", "png")
+    )
+
+@_on_io_loop
+async def generate_images(prompts: list, provider: str = None, max_inflight: int = 16, **kwargs) -> list:
+    """
+    Generate one image per prompt, all in flight at once (e.g. a storyboard).
+
+    Total latency is roughly that of the slowest prompt instead of the sum;
+    at most max_inflight generations hit the provider at the same time.
+
+    Returns:
+        List of image bytes, in the same order as prompts
+    """
+    inflight = asyncio.Semaphore(max_inflight)
+
+    async def generate_one(prompt: str) -> bytes:
+        async with inflight:
+            return await generate_image_async(prompt, provider, **kwargs)
+
+    return await asyncio.gather(*(generate_one(p) for p in prompts))
+
+def generate_image(prompt: str, provider: str = None, **kwargs) -> bytes:
+    """
+    Main function to generate images using the specified provider.
+    Blocks the calling thread until generate_image_async finishes on the shared I/O loop.
+
+    Args:
+        prompt: The text prompt for image generation
+        provider: "dalle", "replicate", or "midjourney_api"
+        **kwargs: Additional parameters (size, quality, model, max_width, max_height, etc.)
+
+    Returns:
+        Image bytes (PNG or WebP; see image_mime_type)
+    """
+    coro = generate_image_async(prompt, provider, **kwargs)
+    return asyncio.run_coroutine_threadsafe(coro, _get_loop()).result()
+
 def image_to_base64(image_bytes: bytes) -> str:
     """Convert image bytes to base64 string."""
-    return base64.b64encode(image_bytes).decode('utf-8')
+    # b2a_base64 is the C encoder under b64encode, minus the wrapper; ascii decodes faster than utf-8
+    return binascii.b2a_base64(image_bytes, newline=False).decode('ascii')
 
-def resize_image(image_bytes: bytes, max_width: int = 2048, max_height: int = 2048) -> bytes:
-    """Resize image if it exceeds maximum dimensions."""
+def image_to_data_uri(image_bytes: bytes, mime: str = "image/png") -> str:
+    """Convert image bytes to a data: URI (e.g. for vision LLM inputs or <img src>)."""
+    prefix = b"data:" + mime.encode("ascii") + b";base64,"
+    return (prefix + binascii.b2a_base64(image_bytes, newline=False)).decode('ascii')
+
+def _parse_size(size: str):
+    """"1024x1792" -> (1024, 1792); None if it is not in WIDTHxHEIGHT form."""
+    try:
+        width, height = size.lower().split("x")
+        return int(width), int(height)
+    except (AttributeError, ValueError):
+        return None
+
+def image_mime_type(image_bytes: bytes) -> str:
+    """MIME type of PNG / WebP / JPEG bytes from their magic number (PNG if unknown)."""
+    if image_bytes[:4] == b"RIFF" and image_bytes[8:12] == b"WEBP":
+        return "image/webp"
+    if image_bytes[:3] == b"\xff\xd8\xff":
+        return "image/jpeg"
+    return "image/png"
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+# JPEG start-of-frame markers (baseline, progressive, ...); not DHT/JPG/DAC
+JPEG_SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+def _png_size(b: bytes):
+    # Signature, IHDR chunk header, then big-endian width/height at bytes 16-24
+    if len(b) >= 24 and b[:8] == PNG_SIGNATURE and b[12:16] == b"IHDR":
+        return struct.unpack(">II", b[16:24])
+    return None
+
+def _jpeg_size(b: bytes):
+    # Walk the marker segments from SOI to the first SOFn: height, width follow the precision byte
+    if b[:2] != b"\xff\xd8":
+        return None
+    i = 2
+    while i + 9 <= len(b):
+        if b[i] != 0xFF:
+            return None
+        marker = b[i + 1]
+        if marker == 0xFF:  # fill byte
+            i += 1
+            continue
+        if marker in JPEG_SOF_MARKERS:
+            height, width = struct.unpack(">HH", b[i + 5:i + 9])
+            return width, height
+        if marker == 0x01 or 0xD0 <= marker <= 0xD7:  # standalone markers, no length
+            i += 2
+            continue
+        i += 2 + struct.unpack(">H", b[i + 2:i + 4])[0]
+    return None
+
+def image_header_size(image_bytes: bytes):
+    """(width, height) of PNG / JPEG bytes read from the header alone, or None."""
+    return _png_size(image_bytes) or _jpeg_size(image_bytes)
+
+def resize_image(
+    image_bytes: bytes,
+    max_width: int = 2048,
+    max_height: int = 2048,
+    known_size: tuple = None,
+    output_format: str = "png",
+) -> bytes:
+    """
+    Resize image if it exceeds maximum dimensions.
+
+    A resized image is re-encoded as output_format: "png" or, opt-in for clients
+    that can decode it, "webp" (lossy, quality 88, roughly half the bytes of PNG
+    on the wire and in base64).
+    known_size = (width, height), when the caller already knows it (e.g. DALL-E's
+    size parameter), lets an in-limit image be returned without opening it;
+    otherwise PNG / JPEG dimensions are read from the header bytes. PIL only runs
+    when a resize is needed or the format is not recognised.
+    """
+    known_size = known_size or image_header_size(image_bytes)
+    if known_size and known_size[0] <= max_width and known_size[1] <= max_height:
+        return image_bytes
     try:
         img = Image.open(BytesIO(image_bytes))
         width, height = img.size
-        
+
         if width > max_width or height > max_height:
-            img.thumbnail((max_width, max_height), Image.Resampling.LANCZOS)
+            # reducing_gap: for large downscales Pillow first box-reduces by an integer
+            # factor (Image.reduce) to within 2x of the target, so Lanczos only runs
+            # over that smaller image. Pillow-SIMD speeds up both passes if installed.
+            img.thumbnail((max_width, max_height), Image.Resampling.LANCZOS, reducing_gap=2.0)
             output = BytesIO()
-            img.save(output, format='PNG')
+            if output_format.lower() == "webp":
+                img.save(output, format='WEBP', quality=88, method=4)
+            else:
+                img.save(output, format='PNG', compress_level=1)  # zlib level 1: much faster, slightly larger
             return output.getvalue()
-        
+
         return image_bytes
     except Exception as e:
-        logging.warning(f"Could not resize image: {e}")
+        logging.warning("Could not resize image: %s", e)
         return image_bytes
 
 
+async def _prewarm() -> None:
+    """Seed DNS + TCP/TLS in the pools the generators use; failures are only logged."""
+    async def head(url: str) -> None:
+        await _get_http_client().head(url, timeout=PREWARM_TIMEOUT)
+
+    warmups = {url: head(url) for url in PREWARM_URLS}
+    if os.getenv("MIDJOURNEY_API_KEY"):
+        warmups[_midjourney_api_url()] = head(_midjourney_api_url())
+    if os.getenv("OPENAI_API_KEY"):
+        # DALL-E goes through the OpenAI client's own connection pool; listing models is free
+        warmups["OpenAI API"] = _get_openai_client().models.list(timeout=PREWARM_TIMEOUT)
+    results = await asyncio.gather(*warmups.values(), return_exceptions=True)
+    for target, result in zip(warmups, results):
+        if isinstance(result, Exception):
+            logging.debug("Prewarm of %s failed: %s", target, result)
+
+if PREWARM:
+    # Fire and forget on the I/O loop so importing the module never blocks
+    asyncio.run_coroutine_threadsafe(_prewarm(), _get_loop())
@@ -8,7 +8,13 @@ import openai
 from dotenv import load_dotenv
 from layout_predict import predict_layout_from_data, save_grids_as_images
 from chat_bot import chat_with_model, chat_with_prompt_refinement
-from image_generator import generate_image, image_to_base64, resize_image
+from image_generator import (
+    ImageGenTransientError,
+    generate_image,
+    image_mime_type,
+    image_to_base64,
+    resolve_midjourney_callback,
+)
 from flask_cors import CORS
 
 app = Flask(__name__)
@@ -180,13 +186,16 @@ def generate_image_endpoint():
         "provider": "dalle" | "replicate" | "midjourney_api" (optional),
         "size": "1024x1024" (for DALL-E, optional),
         "quality": "standard" | "hd" (for DALL-E, optional) - "standard" is faster,
-        "model": "stability-ai/sdxl" (for Replicate, optional)
+        "model": "black-forest-labs/flux-schnell" (for Replicate, optional; default) or e.g. "stability-ai/sdxl",
+        "output_format": "png" | "webp" (optional, default "png") - format of resized / Replicate images;
+                         figma.createImage only takes PNG/JPEG/GIF, so WebP is for other clients
     }
     
     Returns:
     {
         "success": true,
         "image_base64": "base64 encoded image",
+        "mime_type": "image/png" | "image/webp" | "image/jpeg",
         "provider": "provider used",
         "generation_time": 3.5  # seconds
     }
@@ -194,8 +203,8 @@ def generate_image_endpoint():
     Typical generation times:
     - DALL-E 3 (standard): 3-5 seconds
     - DALL-E 3 (HD): 8-12 seconds (slower!)
-    - Replicate (fast models): 2-5 seconds
-    - Replicate (standard): 5-15 seconds
+    - Replicate (flux-schnell, default): 2-5 seconds
+    - Replicate (sdxl): 5-15 seconds
     """
     import time
     start_time = time.time()
@@ -210,20 +219,19 @@ def generate_image_endpoint():
     size = data.get('size', '1024x1024')
     quality = data.get('quality', 'standard')  # Default to "standard" for speed
     model = data.get('model', None)
+    output_format = data.get('output_format', 'png')
     
     try:
         # Generate image
-        kwargs = {}
+        kwargs = {'output_format': output_format}
         if provider == "dalle":
             kwargs['size'] = size
             kwargs['quality'] = quality  # Use "standard" for faster generation
         elif provider == "replicate" and model:
             kwargs['model'] = model
         
-        image_bytes = generate_image(prompt, provider=provider, **kwargs)
-        
-        # Resize if needed (Figma has size limits)
-        image_bytes = resize_image(image_bytes, max_width=2048, max_height=2048)
+        # Resized to fit 2048x2048 inside generate_image (Figma has size limits)
+        image_bytes = generate_image(prompt, provider=provider, max_width=2048, max_height=2048, **kwargs)
         
         # Convert to base64
         image_base64 = image_to_base64(image_bytes)
@@ -233,10 +241,22 @@ def generate_image_endpoint():
         return jsonify({
             "success": True,
             "image_base64": image_base64,
+            "mime_type": image_mime_type(image_bytes),
             "provider": provider or "default",
             "generation_time": round(generation_time, 2)
         })
         
+    except ImageGenTransientError as e:
+        # Still failing after image_generator's own retries; tell the client to retry later
+        generation_time = time.time() - start_time
+        logging.error(f"Image generation failed after {generation_time:.2f}s (transient): {e}")
+        return jsonify({
+            "success": False,
+            "error": str(e),
+            "message": "The image provider is busy or unreachable. Please try again shortly.",
+            "generation_time": round(generation_time, 2)
+        }), 503
+        
     except Exception as e:
         generation_time = time.time() - start_time
         logging.error(f"Image generation failed after {generation_time:.2f}s: {e}")
@@ -247,5 +267,24 @@ def generate_image_endpoint():
             "generation_time": round(generation_time, 2)
         }), 500
 
+@app.route('/mj/callback', methods=['POST'])
+@app.route('/mj/callback/<task_id>', methods=['POST'])
+def midjourney_callback(task_id=None):
+    """
+    Completion webhook for the Midjourney API provider (set MIDJOURNEY_WEBHOOK_URL
+    to this route's public URL, and MIDJOURNEY_WEBHOOK_SECRET). Expects the same JSON as the task status endpoint:
+    {"task_id": ..., "status": "completed" | "failed", "image_url": ..., "error": ...}
+    """
+    data = request.get_json(silent=True) or {}
+    task_id = task_id or data.get('task_id')
+    if not task_id:
+        return jsonify({"error": "task_id is required"}), 400
+
+    secret = request.headers.get('X-Webhook-Secret') or data.get('webhook_secret')
+    if not resolve_midjourney_callback(task_id, data, secret):
+        return jsonify({"error": "Invalid webhook secret"}), 403
+
+    return jsonify({"success": True})
+
 if __name__ == '__main__':
     app.run(port=5000)
\ No newline at end of file